@@ -2,7 +2,6 @@ import tkinter as tk
 from tkinter import ttk
 from main_window import MainWindow
 from select_window_popup import SelectWindowPopup
-from translation_window import TranslationWindow
 
 class WindowManagerApp:
     def __init__(self, root):
@@ -46,6 +45,8 @@ class WindowManagerApp:
 
     def start_translation(self, target_window):
         if not self.translation_window:
+            # diimpor di sini supaya torch tidak dimuat sebelum window pertama muncul
+            from translation_window import TranslationWindow
             self.translation_window = TranslationWindow(self, target_window)
         self.translation_window.show()
 
@@ -0,0 +1,628 @@
+"""Micro benchmarks for the screen translation pipeline.
+
+Run a single benchmark with
+
+    python benchmark.py paragraphs
+"""
+import argparse
+import csv
+import io
+import time
+import tracemalloc
+
+import numpy as np
+
+from ocr_data import OcrData
+
+TSV_COLUMNS = ['level', 'page_num', 'block_num', 'par_num', 'line_num', 'word_num',
+               'left', 'top', 'width', 'height', 'conf', 'text']
+
+
+# Kalimat pendek ala UI/chat untuk benchmark translasi
+SAMPLE_SENTENCES = [
+    "Open the settings menu.",
+    "Your changes have been saved.",
+    "Are you sure you want to close this window?",
+    "The server is not responding, please try again later.",
+    "New message from your friend.",
+    "Click here to download the latest update.",
+    "The file could not be found.",
+    "Press any key to continue.",
+    "You have unsaved changes in this document.",
+    "The player has left the game.",
+    "Loading, please wait.",
+    "Check your internet connection and try again.",
+    "This feature is only available to registered users.",
+    "The meeting starts in five minutes.",
+    "Select a language from the list below.",
+    "Your password must contain at least eight characters.",
+    "The download has finished successfully.",
+    "Do you want to restart the application now?",
+    "An unexpected error occurred while reading the file.",
+    "Thank you for your purchase.",
+    "Please contact Dr. Brown for more details.",
+    "Supported files include images, e.g. PNG and JPEG.",
+    "This report was written by J. Smith.",
+]
+
+
+# Terjemahan rujukan (en -> id) untuk SAMPLE_SENTENCES, dipakai menghitung BLEU
+SAMPLE_REFERENCES = [
+    "Buka menu pengaturan.",
+    "Perubahan Anda telah disimpan.",
+    "Apakah Anda yakin ingin menutup jendela ini?",
+    "Server tidak merespons, silakan coba lagi nanti.",
+    "Pesan baru dari teman Anda.",
+    "Klik di sini untuk mengunduh pembaruan terbaru.",
+    "File tidak dapat ditemukan.",
+    "Tekan tombol apa saja untuk melanjutkan.",
+    "Anda memiliki perubahan yang belum disimpan dalam dokumen ini.",
+    "Pemain telah meninggalkan permainan.",
+    "Memuat, harap tunggu.",
+    "Periksa koneksi internet Anda dan coba lagi.",
+    "Fitur ini hanya tersedia untuk pengguna terdaftar.",
+    "Rapat dimulai dalam lima menit.",
+    "Pilih bahasa dari daftar di bawah ini.",
+    "Kata sandi Anda harus berisi setidaknya delapan karakter.",
+    "Unduhan telah selesai dengan sukses.",
+    "Apakah Anda ingin memulai ulang aplikasi sekarang?",
+    "Terjadi kesalahan tak terduga saat membaca file.",
+    "Terima kasih atas pembelian Anda.",
+    "Silakan hubungi Dr. Brown untuk detail lebih lanjut.",
+    "File yang didukung termasuk gambar, misalnya PNG dan JPEG.",
+    "Laporan ini ditulis oleh J. Smith.",
+]
+
+# Paragraf dan kalimat yang diharapkan dari translation.split_sentences
+SENTENCE_SPLITS = [
+    ("Your changes have been saved. Do you want to close this window?",
+     ["Your changes have been saved.", "Do you want to close this window?"]),
+    ("e.g. this is Mr. Smith.", ["e.g. this is Mr. Smith."]),
+    ("Please contact Dr. Brown for more details. Thank you!",
+     ["Please contact Dr. Brown for more details.", "Thank you!"]),
+    ("This report was written by J. R. Smith. It has 3 parts.",
+     ["This report was written by J. R. Smith.", "It has 3 parts."]),
+    ("Supported files include images, i.e. PNG and JPEG. Other files are skipped.",
+     ["Supported files include images, i.e. PNG and JPEG.", "Other files are skipped."]),
+    ("Chapter 2. 10 minutes left. Hurry up!", ["Chapter 2.", "10 minutes left.", "Hurry up!"]),
+    ("Loading... please wait.", ["Loading... please wait."]),
+]
+
+# Pasangan (teks bersih, hasil OCR yang sedikit berbeda) dari frame ke frame
+OCR_VARIANTS = [
+    ("Open the settings menu.", "Open the settings menu"),
+    ("Open the settings menu.", "0pen the settings menu."),
+    ("Your changes have been saved.", "Your changes have been saved,"),
+    ("Your changes have been saved.", "Your chang es have been saved."),
+    ("Are you sure you want to close this window?", "Are you sure you want to cIose this window?"),
+    ("Are you sure you want to close this window?", "Are you sure you want to close this window ?"),
+    ("The server is not responding, please try again later.", "The server is not responding. please try again later."),
+    ("The server is not responding, please try again later.", "The server is not respondlng, please try again later."),
+    ("New message from your friend.", "New message from your friend"),
+    ("Click here to download the latest update.", "Click here to down1oad the latest update."),
+    ("The file could not be found.", "The fiIe could not be found."),
+    ("Press any key to continue.", "Press any key to continue..."),
+    ("You have unsaved changes in this document.", "You have unsaved changes in this docurnent."),
+    ("The player has left the game.", "The player has |eft the game."),
+    ("Loading, please wait.", "Loading. please wait"),
+    ("Check your internet connection and try again.", "Check your internet connection and try agaln."),
+    ("This feature is only available to registered users.", "This feature is only available to registered users"),
+    ("The meeting starts in five minutes.", "The meeting starts in flve minutes."),
+    ("Select a language from the list below.", "Select a language from the Iist below."),
+    ("Your password must contain at least eight characters.", "Your password must contain at least eight characters,"),
+    ("The download has finished successfully.", "The download has finished successfuIly."),
+    ("Do you want to restart the application now?", "Do you want to restart the appIication now?"),
+    ("An unexpected error occurred while reading the file.", "An unexpected error occurred whi1e reading the file."),
+    ("Thank you for your purchase.", "Thank you for your purchase !"),
+]
+
+# Kalimat mirip tapi berbeda arti, tidak boleh dianggap sama
+OCR_NEGATIVES = [
+    ("Open the settings menu.", "Open the main menu."),
+    ("The file could not be found.", "The file could not be saved."),
+    ("The meeting starts in five minutes.", "The meeting starts in ten minutes."),
+    ("Your changes have been saved.", "Your changes have not been saved."),
+    ("Press any key to continue.", "Press any key to cancel."),
+    ("The player has left the game.", "The player has joined the game."),
+    ("Page 1 of 5", "Page 2 of 5"),
+    ("2 files deleted", "3 files deleted"),
+    ("The meeting starts in 10 minutes.", "The meeting starts in 15 minutes."),
+    ("Delete this file.", "Delete this file?"),
+    ("Level 10 unlocked!", "Level 11 unlocked!"),
+    ("You won!", "You won?"),
+]
+
+
+def make_ocr_tsv(n_words, words_per_line=10, lines_per_par=5, seed=0):
+    """Build fake Tesseract TSV output containing `n_words` words."""
+    rng = np.random.default_rng(seed)
+    rows = []
+    word_w, word_h, gap = 60, 20, 8
+    line_w = words_per_line * (word_w + gap)
+    par_h = lines_per_par * (word_h + gap)
+
+    n_lines = -(-n_words // words_per_line)
+    n_pars = -(-n_lines // lines_per_par)
+    for par in range(n_pars):
+        par_top = par * (par_h + 2 * gap)
+        rows.append((2, 1, par + 1, 0, 0, 0, 0, par_top, line_w, par_h, -1, ""))
+        rows.append((3, 1, par + 1, 1, 0, 0, 0, par_top, line_w, par_h, -1, ""))
+        for line in range(lines_per_par):
+            line_idx = par * lines_per_par + line
+            if line_idx >= n_lines:
+                break
+            line_top = par_top + line * (word_h + gap)
+            rows.append((4, 1, par + 1, 1, line + 1, 0, 0, line_top, line_w, word_h, -1, ""))
+            for word in range(words_per_line):
+                if line_idx * words_per_line + word >= n_words:
+                    break
+                text = "w%d" % rng.integers(0, 10_000)
+                rows.append((5, 1, par + 1, 1, line + 1, word + 1,
+                             word * (word_w + gap), line_top, word_w, word_h, 90.0, text))
+
+    lines = ["\t".join(TSV_COLUMNS)] + ["\t".join(map(str, row)) for row in rows]
+    return "\n".join(lines) + "\n"
+
+
+def read_tsv_dataframe(tsv):
+    """Parse TSV the way pytesseract's `Output.DATAFRAME` does."""
+    import pandas as pd
+    return pd.read_csv(io.StringIO(tsv), quoting=csv.QUOTE_NONE, sep='\t')
+
+
+def extract_paragraphs_iterrows(df):
+    """The original nested `iterrows()` implementation, kept as a baseline."""
+    block_df = df[df['level'] == 3]
+    word_df = df[df['level'] == 5]
+    paragraphs = []
+    for _, block in block_df.iterrows():
+        block_text = ""
+        x, y, w, h = block['left'], block['top'], block['width'], block['height']
+        for _, word in word_df.iterrows():
+            if (word['left'] >= x
+                and word['top'] >= y
+                and word['left'] + word['width'] <= x + w
+                and word['top'] + word['height'] <= y + h):
+                block_text += word['text'] + " "
+        paragraphs.append({'text': block_text.strip(), 'x': x, 'y': y, 'width': w, 'height': h})
+    return paragraphs
+
+
+def timeit(func, *args, repeat=5):
+    """Best wall time of `repeat` calls, in milliseconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def bench_paragraphs(args):
+    from process_image import extract_paragraphs
+
+    print(f"{'words':>8} {'iterrows ms':>12} {'grouped ms':>12} {'speedup':>8}")
+    for n_words in (50, 500, 5000):
+        tsv = make_ocr_tsv(n_words)
+        frame, data = read_tsv_dataframe(tsv), OcrData.from_tsv(tsv)
+        assert extract_paragraphs(data)['text'] == [p['text'] for p in extract_paragraphs_iterrows(frame)]
+        baseline = timeit(extract_paragraphs_iterrows, frame, repeat=1 if n_words > 500 else 3)
+        grouped = timeit(extract_paragraphs, data)
+        print(f"{n_words:>8} {baseline:>12.2f} {grouped:>12.2f} {baseline / grouped:>7.1f}x")
+
+
+def peak_memory(func, *args):
+    """Peak bytes allocated while running `func`, in KiB."""
+    tracemalloc.start()
+    func(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1024
+
+
+def bench_ocr_data(args):
+    def pandas_path(tsv):
+        frame = read_tsv_dataframe(tsv)
+        return frame[frame['level'] >= 3]
+
+    def ocr_data_path(tsv):
+        data = OcrData.from_tsv(tsv)
+        return data[data['level'] >= 3]
+
+    start = time.perf_counter()
+    import pandas  # noqa: F401
+    print(f"pandas import: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    print(f"{'words':>8} {'pandas ms':>10} {'OcrData ms':>11} {'pandas KiB':>11} {'OcrData KiB':>12}")
+    for n_words in (50, 500, 5000):
+        tsv = make_ocr_tsv(n_words)
+        print(f"{n_words:>8} {timeit(pandas_path, tsv):>10.2f} {timeit(ocr_data_path, tsv):>11.2f}"
+              f" {peak_memory(pandas_path, tsv):>11.0f} {peak_memory(ocr_data_path, tsv):>12.0f}")
+
+
+def make_text_image(width=800, height=600, lines=20, seed=0):
+    """Render a white window with black lines of text, as a BGR array."""
+    import cv2
+    rng = np.random.default_rng(seed)
+    words = ["menu", "file", "window", "settings", "translate", "screen", "text", "open",
+             "close", "message", "status", "update", "server", "player", "level", "score"]
+    image = np.full((height, width, 3), 255, dtype=np.uint8)
+    line_height = max(height // (lines + 1), 12)
+    for i in range(lines):
+        sentence = " ".join(rng.choice(words, size=6))
+        cv2.putText(image, sentence, (10, (i + 1) * line_height), cv2.FONT_HERSHEY_SIMPLEX,
+                    line_height / 40, (0, 0, 0), 1, cv2.LINE_AA)
+    return image
+
+
+def bench_ocr_engine(args):
+    from process_image import OEM_OPTION, PSM_OPTION, Tesserract, TesserractAPI
+
+    subprocess_ocr = Tesserract(OEM_OPTION.oem_3, PSM_OPTION.psm_3)
+    start = time.perf_counter()
+    api_ocr = TesserractAPI(OEM_OPTION.oem_3, PSM_OPTION.psm_3)
+    print(f"engine load: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    print(f"{'frame':>10} {'subprocess ms':>14} {'in-process ms':>14}")
+    for width, height, lines in ((320, 120, 3), (800, 600, 20), (1280, 1024, 40)):
+        image = make_text_image(width, height, lines)
+        subprocess_ms = timeit(subprocess_ocr.get_image_data, image)
+        api_ms = timeit(api_ocr.get_image_data, image)
+        print(f"{f'{width}x{height}':>10} {subprocess_ms:>14.1f} {api_ms:>14.1f}")
+
+
+def bench_ocr_parallel(args):
+    from process_image import OEM_OPTION, PSM_OPTION, ParallelTesserract, create_ocr, find_text_regions
+    import cv2
+
+    # dua kolom teks seperti jendela chat/IDE berukuran penuh
+    image = np.full((1080, 1920, 3), 255, dtype=np.uint8)
+    image[:, :940] = make_text_image(940, 1080, 36, seed=1)
+    image[:, 980:] = make_text_image(940, 1080, 36, seed=2)
+    regions = find_text_regions(cv2.cvtColor(image, cv2.COLOR_BGR2GRAY))
+    print(f"{len(regions)} text regions")
+
+    single = timeit(create_ocr(OEM_OPTION.oem_3, PSM_OPTION.psm_3).get_image_data, image, repeat=3)
+    print(f"{'workers':>8} {'ms':>8} {'speedup':>8}")
+    print(f"{'serial':>8} {single:>8.1f} {1:>7.1f}x")
+    for workers in (1, 2, 4, 8, 16):
+        ocr = ParallelTesserract(OEM_OPTION.oem_3, PSM_OPTION.psm_3, workers=workers)
+        elapsed = timeit(ocr.get_image_data, image, repeat=3)
+        ocr.close()
+        print(f"{workers:>8} {elapsed:>8.1f} {single / elapsed:>7.1f}x")
+
+
+def bench_translation_batch(args):
+    from translation_engine import TorchEngine, translate_batch
+
+    engine = TorchEngine("Helsinki-NLP/opus-mt-en-id")
+    model, tokenizer = engine.model, engine.tokenizer
+
+    def per_string(texts):
+        return [tokenizer.decode(model.generate(**tokenizer(text, return_tensors="pt"))[0], skip_special_tokens=True)
+                for text in texts]
+
+    print(f"{'paragraphs':>10} {'per-string ms':>14} {'batched ms':>11} {'batched texts/s':>16}")
+    for n_texts in (5, 20, 60):
+        n = len(SAMPLE_SENTENCES)
+        texts = [f"{SAMPLE_SENTENCES[i % n]} {SAMPLE_SENTENCES[(i % n + 1 + i // n) % n]}" for i in range(n_texts)]
+        single = timeit(per_string, texts, repeat=1)
+        batched = timeit(translate_batch, model, tokenizer, texts, repeat=1)
+        print(f"{n_texts:>10} {single:>14.0f} {batched:>11.0f} {n_texts / batched * 1000:>16.1f}")
+
+
+def bench_sentence_split(args):
+    from translation import split_sentences
+
+    correct = sum(split_sentences(text) == expected for text, expected in SENTENCE_SPLITS)
+    for text, expected in SENTENCE_SPLITS:
+        if split_sentences(text) != expected:
+            print(f"wrong split: {split_sentences(text)}")
+    start = time.perf_counter()
+    for _ in range(1000):
+        for text, _ in SENTENCE_SPLITS:
+            split_sentences(text)
+    elapsed = (time.perf_counter() - start) / (1000 * len(SENTENCE_SPLITS)) * 1e6
+    print(f"{correct}/{len(SENTENCE_SPLITS)} paragraphs split correctly, {elapsed:.1f} us/paragraph")
+
+
+def bench_translation_cache(args):
+    import tempfile
+    from translation_cache import DiskCache, MemoryCache
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tiers = {"memory": MemoryCache(), "disk": DiskCache(f"{tmp}/cache.sqlite3")}
+        print(f"{'tier':>8} {'hit us':>8} {'miss us':>8}")
+        for name, cache in tiers.items():
+            cache.set_many("en-id", {text: text.upper() for text in SAMPLE_SENTENCES})
+            n = 2000
+            start = time.perf_counter()
+            for i in range(n):
+                cache.get("en-id", SAMPLE_SENTENCES[i % len(SAMPLE_SENTENCES)])
+            hit = (time.perf_counter() - start) / n * 1e6
+            start = time.perf_counter()
+            for i in range(n):
+                cache.get("en-id", "missing sentence")
+            miss = (time.perf_counter() - start) / n * 1e6
+            print(f"{name:>8} {hit:>8.1f} {miss:>8.1f}")
+        print(tiers["memory"].stats())
+
+
+def bench_redis_cache(args):
+    from translation_cache import RedisCache
+
+    cache = RedisCache()
+    texts = [f"{SAMPLE_SENTENCES[i % len(SAMPLE_SENTENCES)]} {i}" for i in range(40)]
+
+    def per_string():
+        for text in texts:
+            if cache.get("en-id", text) is None:
+                cache.set("en-id", text, text.upper())
+
+    def batched():
+        results = cache.get_many("en-id", texts)
+        cache.set_many("en-id", {text: text.upper() for text, translation in zip(texts, results) if translation is None})
+
+    print(f"{len(texts)} paragraphs per frame, Redis on localhost")
+    print(f"{'access':>12} {'ms/frame':>9}")
+    for name, frame in (("per string", per_string), ("mget+pipe", batched)):
+        cache.client.delete(*[cache.make_key("en-id", text) for text in texts])
+        print(f"{name:>12} {timeit(frame, repeat=5):>9.2f}")
+
+
+def ui_sentences(n, vocabulary, seed=0) -> list:
+    """`n` random UI-like sentences of 5-10 words drawn from `vocabulary` made-up words"""
+    rng = np.random.default_rng(seed)
+    words = ["".join(chr(97 + c) for c in rng.integers(0, 26, rng.integers(2, 9))) for _ in range(vocabulary)]
+    return [" ".join(rng.choice(words, rng.integers(5, 11))).capitalize() + "." for _ in range(n)]
+
+
+def bench_fuzzy_cache(args):
+    from translation_cache import build_cache
+
+    for threshold in (None, 0.95, 0.9, 0.85, 0.8):
+        cache = build_cache(fuzzy_threshold=threshold)
+        cache.set_many("en-id", {clean: f"<{clean}>" for clean, _ in OCR_VARIANTS + OCR_NEGATIVES})
+        start = time.perf_counter()
+        hits = sum(cache.get("en-id", variant) == f"<{clean}>" for clean, variant in OCR_VARIANTS)
+        elapsed = (time.perf_counter() - start) / len(OCR_VARIANTS) * 1e6
+        false_hits = sum(cache.get("en-id", other) is not None for _, other in OCR_NEGATIVES)
+        label = "exact" if threshold is None else f"fuzzy {threshold}"
+        print(f"{label:>11}: {hits}/{len(OCR_VARIANTS)} variant hits, "
+              f"{false_hits}/{len(OCR_NEGATIVES)} false hits, {elapsed:.0f} us/lookup")
+
+    # indeks penuh berisi teks UI yang mirip satu sama lain, kasus terburuk untuk LSH
+    for vocabulary in (60, 3000):
+        cache = build_cache(fuzzy_threshold=0.9)
+        texts = ui_sentences(cache.index.max_entries, vocabulary)
+        cache.set_many("en-id", {text: text.upper() for text in texts})
+        misses = ui_sentences(200, vocabulary, seed=1)
+        start = time.perf_counter()
+        false_hits = sum(cache.get("en-id", text) is not None for text in misses)
+        miss_us = (time.perf_counter() - start) / len(misses) * 1e6
+        sources = texts[-200:]
+        start = time.perf_counter()
+        hits = sum(cache.get("en-id", text.replace("e", "c", 1)) == text.upper() for text in sources)
+        hit_us = (time.perf_counter() - start) / len(sources) * 1e6
+        print(f"{len(texts)} indexed, {vocabulary} words: {hits}/{len(sources)} variant hits {hit_us:.0f} us/lookup, "
+              f"{false_hits}/{len(misses)} false hits {miss_us:.0f} us/miss")
+
+
+def corpus_bleu(hypotheses, references, max_n=4) -> float:
+    """Corpus BLEU (0-100) with one reference per sentence and whitespace tokens"""
+    import math
+    from collections import Counter
+
+    matches, totals = [0] * max_n, [0] * max_n
+    hyp_len = ref_len = 0
+    for hypothesis, reference in zip(hypotheses, references):
+        hyp, ref = hypothesis.lower().split(), reference.lower().split()
+        hyp_len, ref_len = hyp_len + len(hyp), ref_len + len(ref)
+        for n in range(1, max_n + 1):
+            hyp_ngrams = Counter(tuple(hyp[i:i + n]) for i in range(len(hyp) - n + 1))
+            ref_ngrams = Counter(tuple(ref[i:i + n]) for i in range(len(ref) - n + 1))
+            matches[n - 1] += sum((hyp_ngrams & ref_ngrams).values())
+            totals[n - 1] += max(len(hyp) - n + 1, 0)
+    if not hyp_len or 0 in matches:
+        return 0.0
+    log_precision = sum(math.log(m / t) for m, t in zip(matches, totals)) / max_n
+    brevity = min(1.0, math.exp(1 - ref_len / hyp_len))
+    return 100 * brevity * math.exp(log_precision)
+
+
+def measure_engine(translate, texts=SAMPLE_SENTENCES, references=SAMPLE_REFERENCES):
+    """Single-sentence latency (ms), batch throughput (sentences/s) and BLEU of `translate(texts) -> list`"""
+    translate(texts[:2])  # warm up
+    start = time.perf_counter()
+    for text in texts:
+        translate([text])
+    latency = (time.perf_counter() - start) / len(texts) * 1000
+    start = time.perf_counter()
+    hypotheses = translate(texts)
+    throughput = len(texts) / (time.perf_counter() - start)
+    return latency, throughput, corpus_bleu(hypotheses, references)
+
+
+def bench_translation_engine(args):
+    from translation_engine import CTranslate2Engine, TorchEngine
+
+    model_name = "Helsinki-NLP/opus-mt-en-id"
+    engines = [("torch fp32", lambda: TorchEngine(model_name))]
+    engines += [(f"ctranslate2 {quantization}", lambda q=quantization: CTranslate2Engine(model_name, q))
+                for quantization in ("int8", "int8_float32", "float32")]
+
+    print(f"{'engine':>22} {'load ms':>8} {'latency ms':>11} {'sentences/s':>11} {'BLEU':>6}")
+    for name, create in engines:
+        start = time.perf_counter()
+        engine = create()
+        load = (time.perf_counter() - start) * 1000
+        latency, throughput, bleu = measure_engine(engine.translate)
+        print(f"{name:>22} {load:>8.0f} {latency:>11.1f} {throughput:>11.1f} {bleu:>6.1f}")
+
+
+def bench_quantization(args):
+    from translation_engine import TorchEngine, model_nbytes
+
+    model_name = "Helsinki-NLP/opus-mt-en-id"
+    print(f"{'model':>22} {'load ms':>8} {'weights MB':>10} {'latency ms':>11} {'sentences/s':>11} {'BLEU':>6}")
+    for name, quantize in (("torch fp32", False), ("torch int8 (convert)", True), ("torch int8 (cached)", True)):
+        start = time.perf_counter()
+        engine = TorchEngine(model_name, quantize=quantize)
+        load = (time.perf_counter() - start) * 1000
+        latency, throughput, bleu = measure_engine(engine.translate)
+        print(f"{name:>22} {load:>8.0f} {model_nbytes(engine.model) / 2**20:>10.1f}"
+              f" {latency:>11.1f} {throughput:>11.1f} {bleu:>6.1f}")
+
+
+def bench_precision(args):
+    from translation_engine import TorchEngine, model_nbytes
+
+    model_name = "Helsinki-NLP/opus-mt-en-id"
+    print(f"{'dtype':>10} {'weights MB':>10} {'latency ms':>11} {'sentences/s':>11} {'BLEU':>6}")
+    for dtype in ("float32", "bfloat16"):
+        engine = TorchEngine(model_name, dtype=dtype)
+        latency, throughput, bleu = measure_engine(engine.translate)
+        print(f"{dtype:>10} {model_nbytes(engine.model) / 2**20:>10.1f} {latency:>11.1f} {throughput:>11.1f} {bleu:>6.1f}")
+
+
+def bench_decoding_budget(args):
+    from translation_engine import DecodingController, TorchEngine
+
+    engine = TorchEngine("Helsinki-NLP/opus-mt-en-id")
+    engine.translate(SAMPLE_SENTENCES[:2])
+    # frame berisi 1, 3 atau 6 paragraf bergantian, diulang dua kali
+    frames, start = [], 0
+    for size in (1, 3, 6, 1, 3, 6) * 2:
+        frames.append([SAMPLE_SENTENCES[(start + i) % len(SAMPLE_SENTENCES)] for i in range(size)])
+        start += size
+
+    print(f"{'budget ms':>10} {'p50 ms':>8} {'p95 ms':>8} {'over':>5} {'requests per level':>20} {'BLEU':>6}")
+    for budget in (float("inf"), 800, 300, 100):
+        controller = DecodingController(budget_ms=budget)
+        latencies, hypotheses, references = [], [], []
+        for frame in frames:
+            begin = time.perf_counter()
+            translations, _ = controller.translate(engine, frame)
+            hypotheses += translations
+            latencies.append((time.perf_counter() - begin) * 1000)
+            references += [SAMPLE_REFERENCES[SAMPLE_SENTENCES.index(text)] for text in frame]
+        stats = controller.stats()
+        print(f"{budget:>10.0f} {np.percentile(latencies, 50):>8.0f} {np.percentile(latencies, 95):>8.0f}"
+              f" {stats['over_budget']:>5} {str(stats['requests_per_level']):>20} {corpus_bleu(hypotheses, references):>6.1f}")
+
+
+def bench_model_registry(args):
+    from translation_engine import ModelRegistry
+
+    pairs = ["en-id", "en-fr", "en-de", "en-id", "en-fr", "en-id", "en-de", "en-id"]
+    model_size = ModelRegistry().get("Helsinki-NLP/opus-mt-en-id").nbytes
+    print(f"{'budget':>14} {'switch ms':>10} {'loads':>6} {'evictions':>10} {'peak MB':>8}")
+    for name, max_bytes in (("1 model", 0), ("2 models", 2 * model_size), ("unbounded", None)):
+        registry = ModelRegistry(max_bytes)
+        peak = 0
+        start = time.perf_counter()
+        for pair in pairs:
+            registry.get(f"Helsinki-NLP/opus-mt-{pair}").translate(SAMPLE_SENTENCES[:1])
+            peak = max(peak, registry.nbytes)
+        switch = (time.perf_counter() - start) * 1000 / len(pairs)
+        print(f"{name:>14} {switch:>10.1f} {registry.loads:>6} {registry.evictions:>10} {peak / 2**20:>8.1f}")
+
+
+def bench_micro_batching(args):
+    import threading
+    from translation import MarianMT
+    from translation_cache import MemoryCache
+    from translation_worker import TranslationWorker
+
+    windows, per_window, interval = 3, 40, 0.005
+    translator = MarianMT("en", "id", cache=MemoryCache())
+    translator.translate_text(SAMPLE_SENTENCES[0])
+
+    print(f"{windows} windows each submitting {per_window} paragraphs, one every {interval * 1000:.0f} ms")
+    print(f"{'wait ms':>8} {'max batch':>10} {'mean batch':>11} {'p50 ms':>8} {'p95 ms':>8} {'texts/s':>8}")
+    for max_wait_ms in (0, 5, 20, 50):
+        for max_batch_size in (4, 16, 32):
+            worker = TranslationWorker(max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+            futures = []
+
+            def window(index):
+                for i in range(per_window):
+                    # teks unik supaya tidak ada yang terjawab dari cache
+                    text = f"{SAMPLE_SENTENCES[i % len(SAMPLE_SENTENCES)]} ({max_wait_ms}-{max_batch_size}-{index}-{i})"
+                    futures.append(worker.submit(translator, text))
+                    time.sleep(interval)
+
+            start = time.perf_counter()
+            threads = [threading.Thread(target=window, args=(index,)) for index in range(windows)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            for future in futures:
+                future.result()
+            elapsed = time.perf_counter() - start
+            worker.close()
+
+            stats = worker.stats()
+            print(f"{max_wait_ms:>8} {max_batch_size:>10} {stats['mean_batch_size']:>11.1f} {stats['latency_p50_ms']:>8.0f}"
+                  f" {stats['latency_p95_ms']:>8.0f} {len(futures) / elapsed:>8.1f}")
+
+
+# Dijalankan di proses baru supaya import torch dan load model benar-benar dingin
+COLD_START_SCRIPT = """
+import sys, threading, time
+mode, think = sys.argv[1], float(sys.argv[2])
+start = time.perf_counter()
+if mode == "eager":
+    import process_image
+    process_image.translator.engine
+ui = time.perf_counter() - start
+if mode == "warm-up":
+    threading.Thread(target=lambda: __import__("process_image").translator.warm_up().join()).start()
+time.sleep(think)
+begin = time.perf_counter()
+import process_image
+process_image.translate_texts([{text!r}])
+print(ui * 1000, (time.perf_counter() - begin) * 1000)
+"""
+
+
+def bench_cold_start(args):
+    import subprocess
+    import sys
+
+    script = COLD_START_SCRIPT.format(text=SAMPLE_SENTENCES[0])
+    print(f"user picks a window {args.think:.0f} s after the main window appears")
+    print(f"{'mode':>22} {'main window ms':>15} {'first frame ms':>15}")
+    for mode, name in (("eager", "import-time load"), ("lazy", "lazy, no warm-up"), ("warm-up", "lazy + warm-up")):
+        output = subprocess.run([sys.executable, "-c", script, mode, str(args.think)],
+                                capture_output=True, text=True, check=True).stdout
+        ui, first = map(float, output.split()[-2:])
+        print(f"{name:>22} {ui:>15.0f} {first:>15.0f}")
+
+
+BENCHMARKS = {
+    "paragraphs": bench_paragraphs,
+    "ocr_data": bench_ocr_data,
+    "ocr_engine": bench_ocr_engine,
+    "ocr_parallel": bench_ocr_parallel,
+    "translation_batch": bench_translation_batch,
+    "sentence_split": bench_sentence_split,
+    "translation_cache": bench_translation_cache,
+    "redis_cache": bench_redis_cache,
+    "fuzzy_cache": bench_fuzzy_cache,
+    "translation_engine": bench_translation_engine,
+    "quantization": bench_quantization,
+    "precision": bench_precision,
+    "decoding_budget": bench_decoding_budget,
+    "model_registry": bench_model_registry,
+    "cold_start": bench_cold_start,
+    "micro_batching": bench_micro_batching,
+}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("benchmark", choices=sorted(BENCHMARKS))
+    parser.add_argument("--think", type=float, default=3.0, help="cold_start: seconds before the first frame")
+    args = parser.parse_args()
+    BENCHMARKS[args.benchmark](args)
@@ -3,6 +3,7 @@ from tkinter import ttk
 import customtkinter as ctk
 from PIL import Image, ImageTk
 import os
+import threading
 from tqdm import tqdm
 import requests
 from huggingface_hub import HfApi
@@ -16,6 +17,8 @@ class MainWindow:
         self.selected_window_title = tk.StringVar()
         self.translating = False
         self.api = HfApi()
+        # ModelHandle dari pasangan bahasa yang dipilih, dibuat oleh thread warm-up
+        self.model_handle = None
         self.init_ui()
 
     def init_ui(self):
@@ -62,9 +65,13 @@ class MainWindow:
         self.size_label = tk.Label(self.frame, text="", bg="#000", fg="#DDD")
         self.size_label.place(relx=0.05, rely=0.6, relwidth=0.2)
 
+        self.model_state_label = tk.Label(self.frame, text="", bg="#000", fg="#DDD")
+        self.model_state_label.place(relx=0.05, rely=0.33, relwidth=0.2)
+
         self.progress_bar = ttk.Progressbar(self.frame, orient="horizontal", mode="determinate")
 
         self.check_model_status()
+        self.update_model_state()
 
     def show(self):
         self.frame.pack(fill=tk.BOTH, expand=True)
@@ -82,12 +89,35 @@ class MainWindow:
             if os.path.exists(model_dir):
                 self.api.model_info(model_name)
                 self.update_button_status(model_downloaded=True)
+                self.warm_up_model(src_lang, tgt_lang)
             else:
                 files = self.api.list_repo_files(model_name)
                 
                 self.size_label.config(text=f"Model size between 300MB-1GB")
                 self.update_button_status(model_downloaded=False)
 
+    def warm_up_model(self, src_lang, tgt_lang):
+        """Load the selected pair in the background, so starting a translation does not wait for it
+
+        Only the model is loaded; the pair a running translation uses is
+        switched by `TranslationWindow.start_translation`."""
+        def warm_up():
+            # process_image mengimpor torch dan transformers, jangan blokir UI untuk itu
+            import process_image
+            from translation_engine import ModelHandle
+
+            self.model_handle = ModelHandle(process_image.model_registry, f'Helsinki-NLP/opus-mt-{src_lang}-{tgt_lang}')
+            self.model_handle.warm_up()
+            process_image.load_translation_memory(f"{src_lang}-{tgt_lang}")
+
+        threading.Thread(target=warm_up, daemon=True).start()
+
+    def update_model_state(self):
+        # widget tk hanya boleh diubah dari main thread, jadi state-nya di-poll
+        state = self.model_handle.state if self.model_handle is not None else ""
+        self.model_state_label.config(text=f"Model {state}" if state else "")
+        self.root.after(500, self.update_model_state)
+
     def update_button_status(self, model_downloaded):
         if model_downloaded:
             self.btn_open_window_list.configure(text="Start Translate", command=self.app.show_select_window_popup)
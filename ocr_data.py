@@ -0,0 +1,108 @@
+import sys
+
+import numpy as np
+
+# Kolom numerik dari output TSV Tesseract (kolom terakhir adalah teks)
+OCR_DTYPE = np.dtype([
+    ('level', np.int8),
+    ('page_num', np.int32),
+    ('block_num', np.int32),
+    ('par_num', np.int32),
+    ('line_num', np.int32),
+    ('word_num', np.int32),
+    ('left', np.int32),
+    ('top', np.int32),
+    ('width', np.int32),
+    ('height', np.int32),
+    ('conf', np.float32),
+])
+
+PAGE, BLOCK, PARAGRAPH, LINE, WORD = 1, 2, 3, 4, 5
+
+
+class OcrData:
+    """Compact OCR result parsed straight from Tesseract's TSV output.
+
+    Numeric columns live in one NumPy structured array and the recognized
+    text in a parallel object array, so a frame costs two allocations instead
+    of a pandas DataFrame. Columns are read with ``data["left"]`` and rows are
+    selected with a boolean mask or slice, ``data[data["level"] >= 3]``."""
+
+    __slots__ = ('rows', 'text')
+
+    def __init__(self, rows=None, text=None):
+        self.rows = np.zeros(0, dtype=OCR_DTYPE) if rows is None else rows
+        self.text = np.empty(0, dtype=object) if text is None else text
+
+    @classmethod
+    def from_tsv(cls, tsv):
+        """Parse the TSV written by ``tesseract ... tsv`` or ``TessBaseAPIGetTsvText``."""
+        lines = tsv.splitlines()
+        if lines and lines[0].startswith('level'):
+            lines = lines[1:]
+        lines = [line for line in lines if line]
+        if not lines:
+            return cls()
+
+        # np.loadtxt parses the numeric columns in C straight into the record array
+        rows = np.loadtxt(lines, delimiter='\t', usecols=range(len(OCR_DTYPE.names)),
+                          dtype=OCR_DTYPE, comments=None, ndmin=1)
+        text = np.empty(len(lines), dtype=object)
+        text[:] = [line.rsplit('\t', 1)[1] for line in lines]
+        return cls(rows, text)
+
+    @classmethod
+    def concat(cls, items):
+        items = [item for item in items if len(item)]
+        if not items:
+            return cls()
+        return cls(np.concatenate([item.rows for item in items]),
+                   np.concatenate([item.text for item in items]))
+
+    @property
+    def nbytes(self):
+        """Approximate memory used by this result, including the text strings."""
+        return self.rows.nbytes + self.text.nbytes + sum(sys.getsizeof(text) for text in self.text)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self.text if key == 'text' else self.rows[key]
+        return OcrData(self.rows[key], self.text[key])
+
+    def shifted(self, dx, dy, block_offset=0):
+        """Copy with boxes moved by (dx, dy) and block numbers moved by `block_offset`.
+
+        Used to place the result of a cropped region back into window space."""
+        rows = self.rows.copy()
+        rows['left'] += dx
+        rows['top'] += dy
+        rows['block_num'][rows['level'] >= BLOCK] += block_offset
+        return OcrData(rows, self.text)
+
+    def level(self, level):
+        return self[self.rows['level'] == level]
+
+    @property
+    def blocks(self):
+        return self.level(BLOCK)
+
+    @property
+    def paragraphs(self):
+        return self.level(PARAGRAPH)
+
+    @property
+    def lines(self):
+        return self.level(LINE)
+
+    @property
+    def words(self):
+        return self.level(WORD)
+
+    def paragraph_keys(self):
+        """One int64 per row identifying its (page, block, paragraph)."""
+        return ((self.rows['page_num'].astype(np.int64) << 42)
+                | (self.rows['block_num'].astype(np.int64) << 21)
+                | self.rows['par_num'].astype(np.int64))
@@ -0,0 +1,26 @@
+import pytesseract
+from pytesseract import Output
+
+from ocr_data import OcrData
+from tesseract_api import TessBaseAPI
+
+# Engine milik proses worker, dibuat sekali oleh init_worker
+_image_to_tsv = None
+
+
+def init_worker(oem, psm):
+    """ProcessPoolExecutor initializer: load one Tesseract engine per worker process"""
+    global _image_to_tsv
+    try:
+        _image_to_tsv = TessBaseAPI(oem, psm).image_to_tsv
+    except (OSError, RuntimeError):
+        config = f"--oem {oem} --psm {psm}"
+        _image_to_tsv = lambda gray: pytesseract.image_to_data(gray, output_type=Output.STRING, config=config)
+
+
+def recognize_region(gray) -> OcrData:
+    return OcrData.from_tsv(_image_to_tsv(gray))
+
+
+def ping():
+    return True
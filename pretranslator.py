@@ -0,0 +1,189 @@
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from translation_cache import CACHE_DIR, normalize_text
+
+
+def app_name(window_title) -> str:
+    """Application part of a window title, "notes.txt - Notepad" -> "Notepad" """
+    for separator in (" - ", " — ", " | "):
+        if separator in window_title:
+            return window_title.rsplit(separator, 1)[1].strip()
+    return window_title.strip()
+
+
+class PhraseHistory:
+    def __init__(self, path=None, max_phrases=5000):
+        """How often each source text was seen per application, kept across sessions
+
+        OCR variants of one text (see `translation_cache.normalize_text`)
+        are counted on the first variant seen. Saving merges this session's
+        counts into the file, so processes sharing it add up instead of
+        overwriting each other.
+
+        Parameters
+        ----------
+        path : str
+            JSON file, defaults to phrase_history.json in CACHE_DIR
+        max_phrases : int
+            phrases kept per application, the most frequent win"""
+        self.path = path if path is not None else os.path.join(CACHE_DIR, 'phrase_history.json')
+        self.max_phrases = max_phrases
+        self.lock = threading.Lock()
+        self.counts = self.read()
+        # hitungan sesi ini yang belum disimpan
+        self.session = {}
+        # app -> teks ter-normalisasi -> teks yang dihitung
+        self.canonical = {app: self.canonical_texts(counts) for app, counts in self.counts.items()}
+
+    @staticmethod
+    def canonical_texts(counts) -> dict:
+        canonical = {}
+        for text, _ in counts.most_common():
+            canonical.setdefault(normalize_text(text) or text, text)
+        return canonical
+
+    def read(self) -> dict:
+        """Counts saved in `path`, empty when the file is missing or unreadable"""
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return {app: Counter(counts) for app, counts in json.load(f).items()}
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError, AttributeError, TypeError) as e:
+            print(f"ignoring unreadable phrase history {self.path}: {e}")
+            return {}
+
+    def record(self, app, texts):
+        with self.lock:
+            counts = self.counts.setdefault(app, Counter())
+            session = self.session.setdefault(app, Counter())
+            canonical = self.canonical.setdefault(app, {})
+            for text in texts:
+                if not text.strip():
+                    continue
+                text = canonical.setdefault(normalize_text(text) or text, text)
+                counts[text] += 1
+                session[text] += 1
+            # dipangkas sesekali saja, bukan tiap frame
+            if len(counts) > 2 * self.max_phrases:
+                self.counts[app] = Counter(dict(counts.most_common(self.max_phrases)))
+                self.session[app] = Counter({text: n for text, n in session.items() if text in self.counts[app]})
+                self.canonical[app] = self.canonical_texts(self.counts[app])
+
+    def top(self, app, n) -> list:
+        with self.lock:
+            return [text for text, _ in self.counts.get(app, Counter()).most_common(n)]
+
+    def save(self):
+        with self.lock:
+            session, self.session = self.session, {}
+        try:
+            merged = self.read()
+            for app, counts in session.items():
+                merged.setdefault(app, Counter()).update(counts)
+            data = {app: dict(counts.most_common(self.max_phrases)) for app, counts in merged.items()}
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=os.path.dirname(self.path),
+                                             suffix=".tmp", delete=False) as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(f.name, self.path)
+        except BaseException:
+            # hitungan sesi dikembalikan supaya tidak hilang
+            with self.lock:
+                for app, counts in session.items():
+                    self.session.setdefault(app, Counter()).update(counts)
+            raise
+        with self.lock:
+            # file juga berisi hitungan proses lain; tambahkan yang tercatat selama menyimpan
+            self.counts = {app: Counter(data.get(app, {})) + self.session.get(app, Counter())
+                           for app in set(data) | set(self.session)}
+            self.canonical = {app: self.canonical_texts(counts) for app, counts in self.counts.items()}
+
+
+class SpeculativeTranslator:
+    def __init__(self, history, worker, top_n=200, batch_size=4, max_rate=2.0, idle_seconds=1.0):
+        """Pre-translates the texts an application usually shows, before they appear
+
+        When an application is selected its `top_n` most frequent phrases
+        that are not cached yet are sent through the translation worker a
+        few at a time. It only submits after the worker has been idle for
+        `idle_seconds`, at the lowest priority, and at most `max_rate` texts
+        per second, so live frames always go first.
+
+        Parameters
+        ----------
+        history : PhraseHistory
+            phrase counts per application
+        worker : TranslationWorker
+            worker shared with the live overlay
+        top_n : int
+            most frequent phrases to pre-translate per application
+        batch_size : int
+            phrases submitted at once, keeps a live frame from waiting
+            behind a long speculative batch
+        max_rate : float
+            texts per second
+        idle_seconds : float
+            how long the worker must have been idle before each batch"""
+        self.history = history
+        self.worker = worker
+        self.top_n = top_n
+        self.batch_size = batch_size
+        self.max_rate = max_rate
+        self.idle_seconds = idle_seconds
+        self.thread = None
+        self.stop_event = threading.Event()
+        self.pretranslated = 0
+        self.already_cached = 0
+
+    def start(self, app, translator):
+        """Pre-translate the phrases of `app` with `translator` on a background thread"""
+        self.stop()
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, args=(app, translator, self.stop_event), daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def wait_until_idle(self, stop_event) -> bool:
+        while not stop_event.is_set():
+            idle = self.worker.idle_for()
+            if idle >= self.idle_seconds:
+                return True
+            stop_event.wait(self.idle_seconds - idle)
+        return False
+
+    def run(self, app, translator, stop_event):
+        phrases = self.history.top(app, self.top_n)
+        missing = [text for text, cached in zip(phrases, translator.lookup(phrases)) if cached is None]
+        self.already_cached += len(phrases) - len(missing)
+        try:
+            for start in range(0, len(missing), self.batch_size):
+                if not self.wait_until_idle(stop_event):
+                    return
+                batch = missing[start:start + self.batch_size]
+                began = time.monotonic()
+                # daftarkan sebagai owner supaya tidak di-cancel oleh set_live dari overlay
+                self.worker.set_live(self, translator.pair, batch)
+                # tanpa batas waktu frame, jadi selalu di level decoding terbaik dan masuk cache
+                futures = self.worker.submit_many(translator, batch, [-1.0] * len(batch), math.inf)
+                for future in futures:
+                    while not future.done() and not stop_event.wait(0.1):
+                        pass
+                self.pretranslated += sum(future.done() and not future.cancelled() for future in futures)
+                stop_event.wait(max(len(batch) / self.max_rate - (time.monotonic() - began), 0))
+        finally:
+            self.worker.release(self)
+
+    def stats(self) -> dict:
+        return {"pretranslated": self.pretranslated, "already_cached": self.already_cached}
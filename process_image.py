@@ -2,18 +2,90 @@ import cv2
 import pytesseract
 from pytesseract import Output
 import numpy as np
+import os
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from enum import Enum
-import pandas as pd
+
+import parallel_ocr
+from ocr_data import OcrData
+from tesseract_api import TessBaseAPI
 
 from PIL import Image, ImageDraw, ImageFont
 
-from transformers import MarianMTModel, MarianTokenizer
+from translation import MarianMT, export_translation_memory, import_translation_memory
+from translation_cache import CACHE_DIR, build_cache
+from translation_engine import DecodingController, ModelRegistry
+from translation_worker import TranslationWorker
+from pretranslator import PhraseHistory, SpeculativeTranslator
 
 src_lang = "en"
 tgt_lang = "id"
-model_name = f'Helsinki-NLP/opus-mt-{src_lang}-{tgt_lang}'
-tokenizer = MarianTokenizer.from_pretrained(model_name)
-model = MarianMTModel.from_pretrained(model_name)
+# int8 dynamic quantization untuk layer Linear, lebih hemat memori dan lebih cepat di CPU
+quantize_model = False
+# batas RAM untuk model yang dimuat, pasangan bahasa lama dibebaskan kalau lewat
+model_memory_mb = 1024
+model_registry = ModelRegistry(model_memory_mb * 2**20, quantize=quantize_model)
+# teks yang sama bisa terbaca sedikit berbeda tiap frame, jadi cache-nya toleran.
+# Tier lmdb menyimpan terjemahan antar sesi dan dipakai bersama oleh semua proses
+try:
+    translation_cache = build_cache(("memory", "lmdb"), fuzzy_threshold=0.9)
+except ImportError:
+    translation_cache = build_cache(fuzzy_threshold=0.9)
+# beam search diturunkan ke greedy kalau terjemahan satu frame melewati budget ini
+decoding_controller = DecodingController(budget_ms=400)
+# model baru dimuat saat teks pertama diterjemahkan atau saat translator.warm_up()
+translator = MarianMT(src_lang, tgt_lang, cache=translation_cache, registry=model_registry,
+                      decoding=decoding_controller)
+
+# generate yang lambat tidak lagi menahan loop capture/OCR, request dari semua window digabung per batch
+translation_worker = TranslationWorker(max_batch_size=16, max_wait_ms=10, max_queued=64)
+# teks yang sering muncul per aplikasi diterjemahkan duluan saat worker sedang idle
+phrase_history = PhraseHistory()
+speculative_translator = SpeculativeTranslator(phrase_history, translation_worker)
+# bobot skor prioritas paragraf, lihat paragraph_priorities
+PRIORITY_WEIGHTS = {"area": 0.5, "focus": 0.3, "recency": 0.2}
+
+# terjemahan sesi sebelumnya, dimuat per pasangan bahasa sebelum frame pertama
+TRANSLATION_MEMORY_PATH = os.path.join(CACHE_DIR, 'translation_memory.jsonl')
+loaded_memory_pairs = set()
+
+
+def load_translation_memory(pair, path=TRANSLATION_MEMORY_PATH) -> int:
+    """Pre-warm the cache with the `pair` entries of a translation memory file, once per pair"""
+    if pair in loaded_memory_pairs or not os.path.exists(path):
+        return 0
+    loaded_memory_pairs.add(pair)
+    count = import_translation_memory(path, translation_cache, pair)
+    print(f"loaded {count} {pair} translations from {path}")
+    return count
+
+
+def save_translation_memory(path=TRANSLATION_MEMORY_PATH) -> int:
+    """Export the session's translations for the next one, unless a persistent tier already keeps them"""
+    if translation_cache.persistent:
+        return 0
+    return export_translation_memory(translation_cache, path)
+
+
+def set_language_pair(src, tgt):
+    """Translate with the `src`-`tgt` model from now on, loaded by the registry on first use"""
+    global src_lang, tgt_lang, translator
+    if (src, tgt) != (src_lang, tgt_lang):
+        src_lang, tgt_lang = src, tgt
+        translator = MarianMT(src, tgt, cache=translation_cache, registry=model_registry,
+                              decoding=decoding_controller)
+    return translator
+
+
+def current_translator():
+    """Translator of the active language pair, see `set_language_pair`"""
+    return translator
+
+PARAGRAPH_COLUMNS = ['text', 'x', 'y', 'width', 'height']
 
 class PSM_OPTION(str, Enum):
     """PAGE SEGMENTATION MODE.  Contains
@@ -61,6 +133,73 @@ class OEM_OPTION(str, Enum):
     
     
 
+class OcrCache:
+    def __init__(self, max_bytes=64 * 1024 * 1024) -> None:
+        """LRU cache of OCR results keyed by region pixels and Tesseract config
+
+        Menus, dialogs and HUD labels come back with identical pixels, so
+        their words and boxes are reused instead of running Tesseract again.
+
+        Parameters
+        ----------
+        max_bytes : int
+            memory budget for the cached OcrData, least recently used
+            entries are evicted above it"""
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def make_key(gray, config) -> bytes:
+        gray = np.ascontiguousarray(gray)
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(f"{gray.shape}{config}".encode())
+        digest.update(gray.data)
+        return digest.digest()
+
+    def get(self, key):
+        with self.lock:
+            data = self.entries.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def put(self, key, data:OcrData):
+        nbytes = data.nbytes
+        if nbytes > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.entries:
+                self.size -= self.entries.pop(key).nbytes
+            self.entries[key] = data
+            self.size += nbytes
+            while self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= evicted.nbytes
+                self.evictions += 1
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+
+# Cache bersama untuk semua backend Tesserract, konfigurasi OEM/PSM ikut menjadi bagian key
+ocr_cache = OcrCache()
+
+
 class Tesserract:
     def __init__(self, oem, psm) -> None:
         """Object Character Recognition (OCR)
@@ -72,7 +211,12 @@ class Tesserract:
             OCR engine mode
         psm : str
             Page segmentation mode"""
-        self.tesserract_config = f"{oem} {psm}"
+        self.oem = OEM_OPTION(oem)
+        self.psm = PSM_OPTION(psm)
+        # pakai .value, f-string dari str Enum menghasilkan "OEM_OPTION.oem_3" di Python 3.11+
+        self.tesserract_config = f"{self.oem.value} {self.psm.value}"
+        # set ke None untuk mematikan cache
+        self.cache = ocr_cache
         
     def get_image_text(self,image) -> list:
         image_np = np.array(image)
@@ -82,11 +226,25 @@ class Tesserract:
         content = text.split("\n\n")
         return content
     
-    def get_image_data(self, image, tresh=20) -> dict:
+    def image_to_tsv(self, gray) -> str:
+        # Use pytesseract to do OCR on the image
+        return pytesseract.image_to_data(gray, output_type=Output.STRING, config=self.tesserract_config)
+    
+    def recognize(self, gray) -> OcrData:
+        if self.cache is None:
+            return OcrData.from_tsv(self.image_to_tsv(gray))
+
+        key = self.cache.make_key(gray, self.tesserract_config)
+        data = self.cache.get(key)
+        if data is None:
+            data = OcrData.from_tsv(self.image_to_tsv(gray))
+            self.cache.put(key, data)
+        return data
+    
+    def get_image_data(self, image, tresh=20) -> OcrData:
         image_np = np.array(image)
         gray = cv2.cvtColor(image_np, cv2.COLOR_BGR2GRAY)
-        # Use pytesseract to do OCR on the image
-        data = pytesseract.image_to_data(gray, output_type=Output.DATAFRAME, config=self.tesserract_config)
+        data = self.recognize(gray)
         
         # filter data by confidence level and remove intersected coordinate
         # data = data[(data["conf"] > tresh) * (~data.isna()["text"]) * (data["text"] != " ")].reset_index()
@@ -94,15 +252,422 @@ class Tesserract:
         
         return data
     
+    def get_paragraphs(self, image) -> dict:
+        return extract_paragraphs(self.get_image_data(image))
+
+
+class TesserractAPI(Tesserract):
+    def __init__(self, oem, psm, lang="eng") -> None:
+        """Tesserract backend that keeps one libtesseract engine loaded
+
+        Avoids writing a temp image and starting a tesseract process for
+        every frame; the recognized TSV is the same as the subprocess path.
+
+        Parameters
+        ----------
+        oem : str
+            OCR engine mode
+        psm : str
+            Page segmentation mode
+        lang : str
+            Tesseract language code"""
+        super().__init__(oem, psm)
+        self.api = TessBaseAPI(option_number(self.oem), option_number(self.psm), lang)
+
+    def image_to_tsv(self, gray) -> str:
+        return self.api.image_to_tsv(gray)
+
+
+class ParallelTesserract(Tesserract):
+    def __init__(self, oem, psm, workers=None, min_region_area=400) -> None:
+        """Tesserract backend that recognizes text regions concurrently
+
+        A quick layout pass splits the frame into separate text regions,
+        each region is recognized by a pool of worker processes that keep a
+        Tesseract engine loaded, and the results are stitched back into a
+        single OcrData in window coordinates.
+
+        Parameters
+        ----------
+        oem : str
+            OCR engine mode
+        psm : str
+            Page segmentation mode
+        workers : int
+            number of worker processes, None uses os.cpu_count()
+        min_region_area : int
+            regions smaller than this many pixels are ignored"""
+        super().__init__(oem, psm)
+        self.workers = workers or os.cpu_count()
+        self.min_region_area = min_region_area
+        self.pool = ProcessPoolExecutor(
+            self.workers,
+            initializer=parallel_ocr.init_worker,
+            initargs=(option_number(self.oem), option_number(self.psm)))
+        # jalankan semua worker sekarang supaya frame pertama tidak menunggu engine dimuat
+        for future in [self.pool.submit(parallel_ocr.ping) for _ in range(self.workers)]:
+            future.result()
+
+    def get_image_data(self, image, tresh=20) -> OcrData:
+        image_np = np.array(image)
+        gray = cv2.cvtColor(image_np, cv2.COLOR_BGR2GRAY)
+        regions = find_text_regions(gray, self.min_region_area)
+        regions = split_regions(gray, regions, self.workers)
+        crops = [gray[y:y + h, x:x + w] for x, y, w, h in regions]
+        keys = [None] * len(crops)
+        results = [None] * len(crops)
+        if self.cache is not None:
+            keys = [self.cache.make_key(crop, self.tesserract_config) for crop in crops]
+            results = [self.cache.get(key) for key in keys]
+        futures = [self.pool.submit(parallel_ocr.recognize_region, crop) if result is None else None
+                   for crop, result in zip(crops, results)]
+
+        # nomor blok dibuat unik antar region supaya extract_paragraphs tidak mencampur paragraf
+        tables = []
+        block_offset = 0
+        for (x, y, w, h), key, data, future in zip(regions, keys, results, futures):
+            if future is not None:
+                data = future.result()
+                if self.cache is not None:
+                    self.cache.put(key, data)
+            tables.append(data.shifted(x, y, block_offset))
+            if len(data):
+                block_offset += int(data['block_num'].max())
+        data = OcrData.concat(tables)
+        return data[data["level"]>=3]
+
+    def close(self):
+        self.pool.shutdown()
+
+
+def find_text_regions(gray, min_area=400, padding=4) -> list:
+    """Quick layout pass: (x, y, w, h) rectangles of separate text blocks, top to bottom
+
+    Edges are found with a morphological gradient, so both dark-on-light
+    and light-on-dark text work, then joined horizontally into lines and
+    vertically into blocks."""
+    gradient = cv2.morphologyEx(gray, cv2.MORPH_GRADIENT, cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3)))
+    _, binary = cv2.threshold(gradient, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+    joined = cv2.morphologyEx(binary, cv2.MORPH_CLOSE, cv2.getStructuringElement(cv2.MORPH_RECT, (25, 1)))
+    joined = cv2.dilate(joined, cv2.getStructuringElement(cv2.MORPH_RECT, (3, 9)))
+    contours, _ = cv2.findContours(joined, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    height, width = gray.shape[:2]
+    rects = []
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        if w * h < min_area:
+            continue
+        left, top = max(x - padding, 0), max(y - padding, 0)
+        rects.append((left, top, min(x + w + padding, width) - left, min(y + h + padding, height) - top))
+    return sorted(merge_rects(rects), key=lambda rect: (rect[1], rect[0]))
+
+
+def split_regions(gray, regions, count, min_height=64) -> list:
+    """Cut the tallest regions at blank rows until there are `count` of them
+
+    Keeps every worker busy when the layout pass finds only a few large
+    blocks. Cuts are made on rows without any text so no line is split."""
+    regions = list(regions)
+    unsplittable = set()
+    while len(regions) < count:
+        candidates = [rect for rect in regions if rect not in unsplittable and rect[3] >= 2 * min_height]
+        if not candidates:
+            break
+        x, y, w, h = max(candidates, key=lambda rect: rect[2] * rect[3])
+        crop = gray[y:y + h, x:x + w]
+        blank = np.flatnonzero(crop.max(axis=1).astype(np.int16) - crop.min(axis=1) < 16)
+        blank = blank[(blank >= min_height) & (blank <= h - min_height)]
+        if not len(blank):
+            unsplittable.add((x, y, w, h))
+            continue
+        cut = int(blank[np.argmin(np.abs(blank - h // 2))])
+        regions.remove((x, y, w, h))
+        regions += [(x, y, w, cut), (x, y + cut, w, h - cut)]
+    return sorted(regions, key=lambda rect: (rect[1], rect[0]))
+
+
+def option_number(option) -> int:
+    """Numeric value of an OEM_OPTION / PSM_OPTION, e.g. '--psm 3' -> 3"""
+    return int(option.value.split()[-1])
+
+
+def create_ocr(oem, psm) -> Tesserract:
+    """Use the in-process engine when libtesseract is available, else the subprocess one"""
+    try:
+        return TesserractAPI(oem, psm)
+    except (OSError, RuntimeError) as e:
+        print(f"libtesseract unavailable, using tesseract subprocess: {e}")
+        return Tesserract(oem, psm)
+    
+class FrameChangeDetector:
+    def __init__(self, tolerance=8, size=(128, 128)) -> None:
+        """Detect whether a captured frame differs from the last processed one
+
+        Frames are compared through a small grayscale thumbnail, so the
+        check costs a resize instead of a full OCR pass. The decision uses
+        the largest difference of any thumbnail pixel: one rewritten line
+        is a small part of the frame and barely moves the mean, while
+        capture noise stays a few levels per pixel.
+
+        Parameters
+        ----------
+        tolerance : float
+            largest absolute difference (0-255) of any thumbnail pixel at
+            or below which a frame is treated as unchanged
+        size : tuple
+            (width, height) of the thumbnail"""
+        self.tolerance = tolerance
+        self.size = size
+        self.fingerprint = None
+        self.frame_shape = None
+        self.total_frames = 0
+        self.skipped_frames = 0
+
+    def get_fingerprint(self, image):
+        gray = cv2.cvtColor(np.asarray(image), cv2.COLOR_BGR2GRAY)
+        return cv2.resize(gray, self.size, interpolation=cv2.INTER_AREA).astype(np.int16)
+
+    def has_changed(self, image) -> bool:
+        image = np.asarray(image)
+        fingerprint = self.get_fingerprint(image)
+        self.total_frames += 1
+
+        # bandingkan dengan frame terakhir yang diproses, bukan frame sebelumnya,
+        # supaya perubahan kecil yang menumpuk tetap terdeteksi
+        if (self.fingerprint is not None
+                and image.shape == self.frame_shape
+                and np.abs(fingerprint - self.fingerprint).max() <= self.tolerance):
+            self.skipped_frames += 1
+            return False
+
+        self.fingerprint = fingerprint
+        self.frame_shape = image.shape
+        return True
+
+    def reset(self):
+        self.fingerprint = None
+        self.frame_shape = None
+
+
+class DirtyRegionOCR:
+    def __init__(self, ocr:Tesserract, threshold=24, padding=8, max_dirty_ratio=0.5) -> None:
+        """Re-run OCR only on the parts of the frame that changed
+
+        Consecutive frames are diffed, changed pixels are grouped into a few
+        rectangles and only those crops are recognized. Paragraphs from the
+        previous frame that do not touch a changed rectangle are kept as is.
+
+        Parameters
+        ----------
+        ocr : Tesserract
+            OCR backend used for the crops and for full frames
+        threshold : int
+            gray level difference above which a pixel counts as changed
+        padding : int
+            pixels added around changed areas, also merges nearby changes
+        max_dirty_ratio : float
+            above this fraction of the frame area the whole frame is OCR'd"""
+        self.ocr = ocr
+        self.threshold = threshold
+        self.padding = padding
+        self.max_dirty_ratio = max_dirty_ratio
+
+        self.previous_gray = None
+        self.paragraphs = None
+        self.full_frames = 0
+        self.partial_frames = 0
+        self.frame_pixels = 0
+        self.recognized_pixels = 0
+
+    def get_paragraphs(self, image) -> dict:
+        image = np.asarray(image)
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        frame_area = gray.shape[0] * gray.shape[1]
+        self.frame_pixels += frame_area
+
+        if self.previous_gray is None or self.previous_gray.shape != gray.shape:
+            return self.recognize_full(image, gray)
+
+        rects = find_dirty_rects(self.previous_gray, gray, self.threshold, self.padding)
+        self.previous_gray = gray
+        if not rects:
+            return self.paragraphs
+
+        # paragraf yang tersentuh perubahan dibaca ulang secara utuh
+        boxes = paragraph_boxes(self.paragraphs)
+        touched = np.zeros(len(boxes), dtype=bool)
+        while True:
+            hit = rects_intersect(boxes, rects)
+            if not (hit & ~touched).any():
+                break
+            touched |= hit
+            rects = merge_rects(rects + [tuple(box) for box in boxes[touched].tolist()])
+
+        if sum(w * h for _, _, w, h in rects) > self.max_dirty_ratio * frame_area:
+            return self.recognize_full(image, gray)
+
+        tables = [select_paragraphs(self.paragraphs, ~touched)]
+        for x, y, w, h in rects:
+            tables.append(offset_paragraphs(self.ocr.get_paragraphs(image[y:y + h, x:x + w]), x, y))
+            self.recognized_pixels += w * h
+        self.partial_frames += 1
+        self.paragraphs = concat_paragraphs(tables)
+        return self.paragraphs
+
+    def recognize_full(self, image, gray) -> dict:
+        self.previous_gray = gray
+        self.paragraphs = self.ocr.get_paragraphs(image)
+        self.full_frames += 1
+        self.recognized_pixels += gray.shape[0] * gray.shape[1]
+        return self.paragraphs
+
+    def reset(self):
+        self.previous_gray = None
+        self.paragraphs = None
+
+
+def find_dirty_rects(previous_gray, gray, threshold=24, padding=8) -> list:
+    """Bounding rectangles (x, y, w, h) of the pixels that differ between two gray frames"""
+    mask = (cv2.absdiff(previous_gray, gray) > threshold).astype(np.uint8)
+    if not mask.any():
+        return []
+    kernel = np.ones((2 * padding + 1, 2 * padding + 1), dtype=np.uint8)
+    mask = cv2.dilate(mask, kernel)
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    return merge_rects([cv2.boundingRect(contour) for contour in contours])
+
+
+def merge_rects(rects) -> list:
+    """Merge overlapping (x, y, w, h) rectangles until none overlap"""
+    rects = [tuple(int(v) for v in rect) for rect in rects]
+    merged = True
+    while merged:
+        merged = False
+        result = []
+        for rect in rects:
+            x, y, w, h = rect
+            for i, (ox, oy, ow, oh) in enumerate(result):
+                if x < ox + ow and ox < x + w and y < oy + oh and oy < y + h:
+                    left, top = min(x, ox), min(y, oy)
+                    result[i] = (left, top, max(x + w, ox + ow) - left, max(y + h, oy + oh) - top)
+                    merged = True
+                    break
+            else:
+                result.append(rect)
+        rects = result
+    return rects
+
+
+def rects_intersect(boxes, rects):
+    """For every (x, y, w, h) row of `boxes`, whether it overlaps any of `rects`"""
+    boxes = np.asarray(boxes, dtype=np.int64).reshape(-1, 4)
+    rects = np.asarray(rects, dtype=np.int64).reshape(-1, 4)
+    bx, by, bw, bh = (boxes[:, i, None] for i in range(4))
+    rx, ry, rw, rh = (rects[None, :, i] for i in range(4))
+    overlap = (bx < rx + rw) & (rx < bx + bw) & (by < ry + rh) & (ry < by + bh)
+    return overlap.any(axis=1)
+
+
 def overlay_translated_text(image, ocr:Tesserract):
     image_arr = np.array(image)
-    data = ocr.get_image_data(image_arr)
-    paragraphs_data = extract_paragraphs(data)
+    paragraphs_data = ocr.get_paragraphs(image_arr)
+    paragraphs_data = dict(paragraphs_data, text=translate_texts(paragraphs_data['text']))
     result = draw_bound_from_imagefrom_data(image_arr, paragraphs_data)
     # print("draw bound image success")
     return result
-    
-    
+
+
+class ProgressiveOverlay:
+    def __init__(self, ocr:Tesserract, worker=None, placeholder="...", translator=None):
+        """Overlay that draws a frame before its translations are ready
+
+        `update` OCRs a new frame, submits the paragraph texts to the
+        translation worker and draws right away, with the cached translation
+        where there is one and `placeholder` elsewhere. Call `render` to
+        redraw the same frame when `has_updates` reports new translations.
+        Requests the worker shed under load are submitted again by both, as
+        long as their text is still on screen.
+
+        Parameters
+        ----------
+        ocr : Tesserract
+            OCR backend, e.g. a DirtyRegionOCR
+        worker : TranslationWorker
+            defaults to the shared `translation_worker`
+        placeholder : str
+            text drawn in boxes whose translation is still running
+        translator : MarianMT
+            translator of this overlay, defaults to the active one from
+            `set_language_pair` when the overlay is created. A later
+            language switch does not change it"""
+        self.ocr = ocr
+        self.worker = worker if worker is not None else translation_worker
+        self.placeholder = placeholder
+        self.image = None
+        self.paragraphs = None
+        self.translator = translator if translator is not None else current_translator()
+        self.priorities = []
+        self.deadline = None
+        self.futures = []
+        self.rendered = 0
+        # teks -> waktu pertama kali terlihat, untuk skor recency
+        self.first_seen = {}
+
+    def update(self, image, focus=None):
+        """OCR a new frame and draw it, `focus` is the (x, y) the user looks at, e.g. the cursor"""
+        self.image = np.array(image)
+        self.paragraphs = self.ocr.get_paragraphs(self.image)
+        texts = self.paragraphs['text']
+
+        now = time.monotonic()
+        self.first_seen = {text: self.first_seen.get(text, now) for text in texts}
+        age = np.array([now - self.first_seen[text] for text in texts])
+        priorities = paragraph_priorities(self.paragraphs, self.image.shape, focus, age)
+
+        translator = self.translator
+        # teks yang sudah hilang dari layar tidak perlu diterjemahkan lagi
+        self.worker.set_live(self, translator.pair, texts)
+        self.priorities = priorities
+        # semua batch dari frame ini berbagi satu budget decoding
+        self.deadline = now + translator.decoding.budget_ms / 1000 if translator.decoding is not None else None
+        self.futures = self.worker.submit_many(translator, texts, priorities, self.deadline)
+        return self.render()
+
+    def resubmit_cancelled(self):
+        """Queue again the texts of this frame whose requests were cancelled, e.g. shed by the worker"""
+        cancelled = [i for i, future in enumerate(self.futures) if future.cancelled()]
+        if not cancelled:
+            return
+        texts = self.paragraphs['text']
+        futures = self.worker.submit_many(self.translator, [texts[i] for i in cancelled],
+                                          [self.priorities[i] for i in cancelled], self.deadline)
+        for i, future in zip(cancelled, futures):
+            self.futures[i] = future
+
+    def close(self):
+        self.worker.release(self)
+
+    @property
+    def completed(self) -> int:
+        return sum(future.done() and not future.cancelled() for future in self.futures)
+
+    def has_updates(self) -> bool:
+        if self.image is None:
+            return False
+        self.resubmit_cancelled()
+        return self.completed > self.rendered
+
+    def translations(self) -> list:
+        return [future.result() if future.done() and not future.cancelled() and future.exception() is None
+                else self.placeholder for future in self.futures]
+
+    def render(self):
+        self.resubmit_cancelled()
+        self.rendered = self.completed
+        return draw_bound_from_imagefrom_data(self.image, dict(self.paragraphs, text=self.translations()))
+
+
 # Convert the image to grayscale
 def draw_bound_from_imagefrom_data(img, data):
     img = img.copy()
@@ -125,32 +690,84 @@ def draw_bound_from_imagefrom_data(img, data):
     
     return img
 
-def extract_paragraphs(df : pd.DataFrame):
-    block_df = df[df['level'] == 3]
-    word_df = df[df['level'] == 5]
+def extract_paragraphs(data : OcrData) -> dict:
+    """Gabungkan kata-kata (level 5) menjadi teks paragraf (level 3).
 
-    paragraphs = []
+    Tesseract already numbers every row with its page/block/paragraph, so
+    words are matched to their paragraph by those keys instead of testing
+    box containment word by word, and all texts are joined in one grouped pass.
+
+    Parameters
+    ----------
+    data : OcrData
+        OCR data from `Tesserract.get_image_data`
+
+    Returns
+    -------
+    dict
+        lists text, x, y, width, height with one entry per paragraph"""
+    blocks = data.paragraphs
+    words = data.words
+
+    # Buang kata kosong lalu urutkan kata berdasarkan paragrafnya
+    word_text = np.array([str(text).strip() for text in words['text']], dtype=object)
+    keep = word_text != ""
+    word_keys = words.paragraph_keys()[keep]
+    word_text = word_text[keep]
+    order = np.argsort(word_keys, kind='stable')
+    group_keys, starts = np.unique(word_keys[order], return_index=True)
+    group_text = np.split(word_text[order], starts[1:]) if len(order) else []
+    paragraph_text = {key: " ".join(chunk) for key, chunk in zip(group_keys.tolist(), group_text)}
+
+    paragraphs = {
+        'text': [paragraph_text.get(key, "") for key in blocks.paragraph_keys().tolist()],
+        'x': blocks['left'].tolist(),
+        'y': blocks['top'].tolist(),
+        'width': blocks['width'].tolist(),
+        'height': blocks['height'].tolist(),
+    }
+
+    return paragraphs
+
+
+def paragraph_boxes(paragraphs) -> np.ndarray:
+    return np.array([paragraphs['x'], paragraphs['y'], paragraphs['width'], paragraphs['height']], dtype=np.int64).T.reshape(-1, 4)
 
-    # Loop melalui setiap blok paragraf
-    for idx, block in block_df.iterrows():
-        block_text = ""
-        x, y, w, h = block['left'], block['top'], block['width'], block['height']
-        
-        # Cari semua kata dalam blok ini
-        for _, word in word_df.iterrows():
-            if (word['left'] >= x
-                and word['top'] >= y
-                and word['left'] + word['width'] <= x + w
-                and word['top'] + word['height'] <= y + h):
-                block_text += word['text'] + " "
-        
-        block_text = block_text.strip()
-        paragraphs.append({'text': block_text, 'x': x, 'y': y, 'width': w, 'height': h})
 
-        # Buat DataFrame dari hasil
-    paragraphs_df = pd.DataFrame(paragraphs, columns=['text', 'x', 'y', 'width', 'height'])
+def paragraph_priorities(paragraphs, frame_shape, focus=None, age=None, half_life=2.0) -> np.ndarray:
+    """Translation priority of each paragraph, higher is translated first
 
-    return paragraphs_df
+    Weighted by PRIORITY_WEIGHTS: the box area relative to the frame (square
+    root, so mid-sized text is not drowned by one big block), closeness of
+    the box centre to `focus` (the frame centre when None) and how recently
+    the text appeared, halving every `half_life` seconds of `age`."""
+    boxes = paragraph_boxes(paragraphs).astype(np.float64)
+    height, width = frame_shape[:2]
+    if focus is None:
+        focus = (width / 2, height / 2)
+
+    area = np.sqrt(np.clip(boxes[:, 2] * boxes[:, 3] / (width * height), 0, 1))
+    centres = boxes[:, :2] + boxes[:, 2:] / 2
+    distance = np.hypot(centres[:, 0] - focus[0], centres[:, 1] - focus[1])
+    focus_score = 1 - np.clip(distance / np.hypot(width, height), 0, 1)
+    recency = np.ones(len(boxes)) if age is None else 0.5 ** (np.asarray(age, dtype=np.float64) / half_life)
+    return (PRIORITY_WEIGHTS["area"] * area + PRIORITY_WEIGHTS["focus"] * focus_score
+            + PRIORITY_WEIGHTS["recency"] * recency)
+
+
+def select_paragraphs(paragraphs, mask) -> dict:
+    return {key: [value for value, keep in zip(values, mask) if keep] for key, values in paragraphs.items()}
+
+
+def offset_paragraphs(paragraphs, dx, dy) -> dict:
+    """Shift paragraph coordinates from a crop back to window space"""
+    return dict(paragraphs,
+                x=[x + dx for x in paragraphs['x']],
+                y=[y + dy for y in paragraphs['y']])
+
+
+def concat_paragraphs(tables) -> dict:
+    return {key: [value for table in tables for value in table[key]] for key in PARAGRAPH_COLUMNS}
 
     
 def draw_multiline_text(image, text, coords, font, font_scale, font_thickness, color, max_width):
@@ -249,7 +866,9 @@ def add_text_to_image(image_array, coordinates, text):
     return np.array(image)
 
 def translate_text(text):
+    return translate_texts([text])[0]
 
-    
-    translated = model.generate(**tokenizer(text, return_tensors="pt", padding=True))
-    return tokenizer.decode(translated[0], skip_special_tokens=True)
+
+def translate_texts(texts) -> list:
+    """Translate all paragraph texts of a frame in padded batches, cached ones are reused"""
+    return translator.translate_batch(texts)
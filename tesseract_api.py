@@ -0,0 +1,120 @@
+import ctypes
+import ctypes.util
+import glob
+import os
+import shutil
+import threading
+
+import numpy as np
+import pytesseract
+
+_library = None
+
+
+def find_library():
+    """Locate libtesseract, looking next to the tesseract executable on Windows."""
+    for name in ("tesseract", "libtesseract-5", "libtesseract-4", "libtesseract"):
+        path = ctypes.util.find_library(name)
+        if path:
+            return path
+
+    tesseract_cmd = shutil.which(pytesseract.pytesseract.tesseract_cmd)
+    if tesseract_cmd:
+        install_dir = os.path.dirname(os.path.realpath(tesseract_cmd))
+        for pattern in ("libtesseract*.dll", "libtesseract*.so*", "libtesseract*.dylib"):
+            matches = sorted(glob.glob(os.path.join(install_dir, pattern)))
+            if matches:
+                return matches[-1]
+    return None
+
+
+def load_library():
+    global _library
+    if _library is not None:
+        return _library
+
+    path = find_library()
+    if path is None:
+        raise OSError("libtesseract not found")
+    lib = ctypes.CDLL(path)
+
+    lib.TessBaseAPICreate.restype = ctypes.c_void_p
+    lib.TessBaseAPICreate.argtypes = []
+    lib.TessBaseAPIInit2.restype = ctypes.c_int
+    lib.TessBaseAPIInit2.argtypes = [ctypes.c_void_p, ctypes.c_char_p, ctypes.c_char_p, ctypes.c_int]
+    lib.TessBaseAPISetPageSegMode.restype = None
+    lib.TessBaseAPISetPageSegMode.argtypes = [ctypes.c_void_p, ctypes.c_int]
+    lib.TessBaseAPISetImage.restype = None
+    lib.TessBaseAPISetImage.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_int]
+    lib.TessBaseAPIRecognize.restype = ctypes.c_int
+    lib.TessBaseAPIRecognize.argtypes = [ctypes.c_void_p, ctypes.c_void_p]
+    # char* harus dibebaskan lewat TessDeleteText, jadi jangan pakai c_char_p
+    lib.TessBaseAPIGetTsvText.restype = ctypes.c_void_p
+    lib.TessBaseAPIGetTsvText.argtypes = [ctypes.c_void_p, ctypes.c_int]
+    lib.TessDeleteText.restype = None
+    lib.TessDeleteText.argtypes = [ctypes.c_void_p]
+    lib.TessBaseAPIClear.restype = None
+    lib.TessBaseAPIClear.argtypes = [ctypes.c_void_p]
+    lib.TessBaseAPIEnd.restype = None
+    lib.TessBaseAPIEnd.argtypes = [ctypes.c_void_p]
+    lib.TessBaseAPIDelete.restype = None
+    lib.TessBaseAPIDelete.argtypes = [ctypes.c_void_p]
+
+    _library = lib
+    return lib
+
+
+class TessBaseAPI:
+    def __init__(self, oem=3, psm=3, lang="eng", datapath=None) -> None:
+        """Long-lived libtesseract engine driven through its C API.
+
+        The traineddata is loaded once here and reused by every
+        `image_to_tsv` call, instead of being reloaded by a new tesseract
+        process for each frame.
+
+        Parameters
+        ----------
+        oem : int
+            OCR engine mode
+        psm : int
+            Page segmentation mode
+        lang : str
+            Tesseract language code
+        datapath : str
+            tessdata directory, None uses TESSDATA_PREFIX"""
+        self.lib = load_library()
+        self.lock = threading.Lock()
+        self.handle = self.lib.TessBaseAPICreate()
+
+        datapath = datapath.encode() if datapath else None
+        if self.lib.TessBaseAPIInit2(self.handle, datapath, lang.encode(), oem) != 0:
+            self.close()
+            raise RuntimeError(f"Could not initialize tesseract with language '{lang}'")
+        self.lib.TessBaseAPISetPageSegMode(self.handle, psm)
+
+    def image_to_tsv(self, gray) -> str:
+        """Recognize a single channel uint8 image and return Tesseract's TSV rows."""
+        gray = np.ascontiguousarray(gray, dtype=np.uint8)
+        height, width = gray.shape[:2]
+
+        with self.lock:
+            self.lib.TessBaseAPISetImage(self.handle, gray.ctypes.data, width, height, 1, gray.strides[0])
+            if self.lib.TessBaseAPIRecognize(self.handle, None) != 0:
+                raise RuntimeError("Tesseract recognition failed")
+            pointer = self.lib.TessBaseAPIGetTsvText(self.handle, 0)
+            try:
+                tsv = ctypes.string_at(pointer).decode("utf-8") if pointer else ""
+            finally:
+                if pointer:
+                    self.lib.TessDeleteText(pointer)
+                self.lib.TessBaseAPIClear(self.handle)
+        return tsv
+
+    def close(self):
+        if getattr(self, "handle", None):
+            self.lib.TessBaseAPIEnd(self.handle)
+            self.lib.TessBaseAPIDelete(self.handle)
+            self.handle = None
+
+    def __del__(self):
+        self.close()
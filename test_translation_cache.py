@@ -0,0 +1,81 @@
+"""Redis tiers of translation_cache against an in-process fakeredis server
+
+    python -m pytest test_translation_cache.py
+"""
+import asyncio
+
+import pytest
+
+import translation_cache
+from translation_cache import AsyncRedisCache, RedisCache, redis_pool
+
+fakeredis = pytest.importorskip("fakeredis")
+redis = pytest.importorskip("redis")
+
+
+@pytest.fixture
+def server(monkeypatch):
+    """Fake server behind the shared pool of localhost:6379/0"""
+    server = fakeredis.FakeServer()
+    connection_class = getattr(fakeredis, "FakeRedisConnection", None) or fakeredis.FakeConnection
+    pool = redis.ConnectionPool(connection_class=connection_class, server=server)
+    monkeypatch.setattr(translation_cache, "_redis_pools", {("localhost", 6379, 0): pool})
+    return server
+
+
+def test_get_many_keeps_order_with_misses(server):
+    cache = RedisCache()
+    cache.set_many("en-id", {"Open": "Buka", "Save": "Simpan"})
+
+    assert cache.get_many("en-id", ["Save", "Close", "Open", "Save"]) == ["Simpan", None, "Buka", "Simpan"]
+    assert cache.get_many("en-ja", ["Open"]) == [None]
+    assert cache.get_many("en-id", []) == []
+
+
+def test_set_many_is_one_pipelined_round_trip_with_ttl(server, monkeypatch):
+    cache = RedisCache(ttl=60)
+    executed = []
+    pipeline = cache.client.pipeline
+
+    def counting_pipeline(*args, **kwargs):
+        p = pipeline(*args, **kwargs)
+        execute = p.execute
+        p.execute = lambda *a, **kw: executed.append(len(p.command_stack)) or execute(*a, **kw)
+        return p
+
+    monkeypatch.setattr(cache.client, "pipeline", counting_pipeline)
+    cache.set_many("en-id", {"Open": "Buka", "Save": "Simpan", "Close": "Tutup"})
+
+    assert executed == [3]
+    for text in ("Open", "Save", "Close"):
+        assert 0 < cache.client.ttl(RedisCache.make_key("en-id", text)) <= 60
+    assert cache.get("en-id", "Close") == "Tutup"
+
+
+def test_without_ttl_entries_do_not_expire(server):
+    cache = RedisCache()
+    cache.set("en-id", "Open", "Buka")
+
+    assert cache.client.ttl(RedisCache.make_key("en-id", "Open")) == -1
+
+
+def test_caches_of_one_server_share_a_pool(server):
+    first, second = RedisCache(), RedisCache()
+
+    assert first.client.connection_pool is second.client.connection_pool
+    assert first.client.connection_pool is redis_pool()
+    first.set("en-id", "Open", "Buka")
+    assert second.get("en-id", "Open") == "Buka"
+
+
+def test_async_write_is_readable_by_sync_client(server):
+    async def write():
+        cache = AsyncRedisCache(ttl=60)
+        cache.client = fakeredis.FakeAsyncRedis(server=server)
+        await cache.set_many("en-id", {"Open": "Buka", "Save": "Simpan"})
+        result = await cache.get_many("en-id", ["Save", "Close"])
+        await cache.close()
+        return result
+
+    assert asyncio.run(write()) == ["Simpan", None]
+    assert RedisCache().get_many("en-id", ["Open", "Close", "Save"]) == ["Buka", None, "Simpan"]
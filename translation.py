@@ -1,40 +1,300 @@
-from transformers import MarianMTModel, MarianTokenizer
+import json
+import os
+import re
+import tempfile
+import xml.etree.ElementTree as ET
+from collections import OrderedDict
+from xml.sax.saxutils import escape, quoteattr
 
-import redis
-import hashlib
+from translation_cache import build_cache
+from translation_engine import ModelHandle, ModelRegistry
+
+SENTENCE_END = re.compile(r'(?<=[.!?\u3002\uff01\uff1f])\s+')
+# singkatan yang titiknya bukan akhir kalimat, huruf kecil tanpa titik terakhir
+ABBREVIATIONS = {"mr", "mrs", "ms", "dr", "prof", "sr", "jr", "st", "vs", "e.g", "i.e", "cf", "approx", "fig", "dept"}
 
-# Inisialisasi Redis
 
 class MarianMT:
-    def __init__(self, src_lang, tgt_lang):
+    def __init__(self, src_lang, tgt_lang, cache=None, sentence_level=True, registry=None, decoding=None,
+                 engine="torch", **engine_options):
+        """Helsinki-NLP opus-mt translator with a cache in front of the model
+
+        Parameters
+        ----------
+        src_lang : str
+            source language code
+        tgt_lang : str
+            target language code
+        cache : TranslationCache
+            cache tiers to use, defaults to an in-memory LRU only
+            (see `translation_cache.build_cache` for Redis/disk tiers)
+        sentence_level : bool
+            cache and translate each sentence of a paragraph separately, so
+            a paragraph that gained one sentence only translates that one
+        registry : ModelRegistry
+            loaded models shared with translators of other language pairs.
+            The model is looked up there on first use, not here
+        decoding : DecodingController
+            picks beam count and max_new_tokens per request to stay within
+            a latency budget, None uses the model's generation config.
+            Translations from a degraded level are only kept in memory as
+            `provisional` and are translated again at the best level by
+            `refine` or once it fits the budget, only those reach the cache
+        engine : str
+            inference engine from `translation_engine.ENGINES`, "torch" or
+            "ctranslate2"; `engine_options` are passed to it. Only used when
+            no registry is given"""
         self.model_name = f'Helsinki-NLP/opus-mt-{src_lang}-{tgt_lang}'
-        self.tokenizer = MarianTokenizer.from_pretrained(self.model_name)
-        self.model = MarianMTModel.from_pretrained(self.model_name)
+        self.pair = f"{src_lang}-{tgt_lang}"
+        self.registry = registry if registry is not None else ModelRegistry(engine=engine, **engine_options)
+        self.handle = ModelHandle(self.registry, self.model_name)
+        self.decoding = decoding
         
-        self.redis_client = redis.StrictRedis(host='localhost', port=6379, db=0)
-    
-    def generate_cache_key(text, target_language):
-        # Buat kunci cache unik berdasarkan teks dan bahasa target
-        key = f"{text}:{target_language}"
-        return hashlib.md5(key.encode()).hexdigest()
+        self.cache = cache if cache is not None else build_cache()
+        self.sentence_level = sentence_level
+        # teks -> terjemahan dari level decoding yang diturunkan, tidak masuk cache
+        self.provisional = OrderedDict()
+        self.max_provisional = 1000
+
+    @property
+    def engine(self):
+        # jangan disimpan di atribut, supaya registry bisa membebaskan modelnya
+        return self.handle.get()
+
+    @property
+    def state(self) -> str:
+        """Readiness of the model, see `translation_engine.ModelHandle`"""
+        return self.handle.state
+
+    def warm_up(self):
+        return self.handle.warm_up()
+
+    @property
+    def tokenizer(self):
+        return self.registry.tokenizer(self.model_name)
+
+    @property
+    def model(self):
+        # hanya ada untuk engine torch
+        return getattr(self.engine, "model", None)
 
     def translate_text(self, text):
-        cache_key = self.generate_cache_key(text)
-        
+        return self.translate_batch([text])[0]
+
+    def translate_batch(self, texts, deadline=None):
+        """Translate many strings, only cache misses reach the model, results keep input order
+
+        `deadline` is the time.monotonic() by which the frame these texts
+        belong to should be translated, see `DecodingController.translate`"""
+        texts = list(texts)
+        if not self.sentence_level:
+            return self.translate_segments(texts, deadline)
+
+        pieces = [split_sentences(text) for text in texts]
+        sentences = list(dict.fromkeys(sentence for piece in pieces for sentence in piece))
+        translated = dict(zip(sentences, self.translate_segments(sentences, deadline)))
+        return [" ".join(translated[sentence] for sentence in piece) for piece in pieces]
+
+    def lookup(self, texts) -> list:
+        """Cached translation of each text, or None when any part of it is not cached yet"""
+        texts = list(texts)
+        if not self.sentence_level:
+            return self.cache.get_many(self.pair, texts)
+
+        pieces = [split_sentences(text) for text in texts]
+        sentences = list(dict.fromkeys(sentence for piece in pieces for sentence in piece))
+        cached = dict(zip(sentences, self.cache.get_many(self.pair, sentences)))
+        return [" ".join(cached[sentence] for sentence in piece)
+                if all(cached[sentence] is not None for sentence in piece) else None
+                for piece in pieces]
+
+    def translate_segments(self, texts, deadline=None):
+        """Translate already split segments, only cache misses reach the model"""
         # Cek apakah hasil translasi sudah ada dalam cache
-        cached_translation = self.redis_client.get(cache_key)
-        
-        if cached_translation:
-            return cached_translation.decode('utf-8')
+        results = self.cache.get_many(self.pair, texts)
+        missing = [i for i, translation in enumerate(results) if translation is None]
         
+        if not missing:
+            return results
+
         # Jika tidak ada dalam cache, lakukan translasi
-        result = self.model.generate(**self.tokenizer(text, return_tensors="pt", padding=True))
-        translated_text = self.tokenizer.decode(result[0], skip_special_tokens=True)
-        
-        # Simpan hasil translasi dalam cache
-        self.redis_client.set(cache_key, translated_text)
+        sources = [texts[i] for i in missing]
+        provisional = [self.provisional.get(text) for text in sources]
+        if self.decoding is None:
+            translated, level = self.engine.translate(sources), 0
+        elif None not in provisional and self.decoding.choose(sources, self.decoding.remaining_ms(deadline)) > 0:
+            # level terbaik masih belum masuk budget, pakai hasil sementara tanpa memanggil model
+            translated, level = provisional, None
+        else:
+            translated, level = self.decoding.translate(self.engine, sources, deadline)
+
+        translations = dict(zip(sources, translated))
+        if level == 0:
+            # Simpan hasil translasi dalam cache
+            self.cache.set_many(self.pair, translations)
+            for text in sources:
+                self.provisional.pop(text, None)
+        elif level is not None:
+            self.provisional.update(translations)
+            for text in sources:
+                self.provisional.move_to_end(text)
+            while len(self.provisional) > self.max_provisional:
+                self.provisional.popitem(last=False)
+        for i, translated_text in zip(missing, translated):
+            results[i] = translated_text
         
-        return translated_text
+        return results
+
+    def refine(self, max_texts=4) -> int:
+        """Translate the newest `max_texts` provisional translations again at the best level
+
+        The results are cached like any level 0 translation. Meant for idle
+        time, see `TranslationWorker`. Returns how many were translated."""
+        if not self.provisional or self.decoding is None:
+            return 0
+        texts = list(self.provisional)[-max_texts:]
+        translated, _ = self.decoding.translate(self.engine, texts, level=0)
+        self.cache.set_many(self.pair, dict(zip(texts, translated)))
+        for text in texts:
+            self.provisional.pop(text, None)
+        return len(texts)
+
+
+def split_sentences(text) -> list:
+    """Split a paragraph into sentences on ., ! and ? followed by whitespace
+
+    A period after an abbreviation or an initial, or one followed by a
+    lowercase word, does not end the sentence, so "e.g. this is Mr. Smith."
+    stays in one piece."""
+    sentences = []
+    for piece in SENTENCE_END.split(" ".join(text.split())):
+        if not piece:
+            continue
+        if sentences and not ends_sentence(sentences[-1], piece):
+            sentences[-1] += " " + piece
+        else:
+            sentences.append(piece)
+    return sentences
+
+
+def ends_sentence(sentence, following) -> bool:
+    """Whether the punctuation at the end of `sentence` ends it, given the text `following` it"""
+    last_word = sentence.rsplit(" ", 1)[-1]
+    if last_word.endswith("."):
+        word = last_word[:-1].lstrip("\"'([")
+        if word.lower() in ABBREVIATIONS or (len(word) == 1 and word.isalpha()):
+            return False
+    # huruf tanpa kapital (mis. aksara CJK) tetap dianggap awal kalimat
+    return not following.lstrip("\"'([")[:1].islower()
+
+
+def tmx_language(lang) -> str:
+    """Language code of a TMX xml:lang such as en-US, as used in our pairs"""
+    return lang.replace("_", "-").split("-")[0].lower()
+
+
+def iter_translation_memory(path):
+    """Stream (pair, source, translation) out of a .tmx or JSONL translation memory
+
+    JSONL has one {"pair", "source", "target"} object per line. TMX is read
+    with iterparse and every <tu> is discarded once read, so memory use
+    does not grow with the file."""
+    if not path.lower().endswith(".tmx"):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    yield entry["pair"], entry["source"], entry["target"]
+        return
+
+    header_lang = None
+    body = None
+    xml_lang = "{http://www.w3.org/XML/1998/namespace}lang"
+    for event, element in ET.iterparse(path, events=("start", "end")):
+        if event == "start":
+            if element.tag == "header":
+                header_lang = element.get("srclang")
+            elif element.tag == "body":
+                body = element
+            continue
+        if element.tag != "tu":
+            continue
+
+        segments = {}
+        for tuv in element.iter("tuv"):
+            seg = tuv.find("seg")
+            lang = tuv.get(xml_lang) or tuv.get("lang")
+            if seg is not None and lang:
+                segments[tmx_language(lang)] = "".join(seg.itertext())
+        src_lang = element.get("srclang") or header_lang
+        src_lang = tmx_language(src_lang) if src_lang and src_lang != "*all*" else next(iter(segments), None)
+        if src_lang in segments:
+            for tgt_lang, translation in segments.items():
+                if tgt_lang != src_lang:
+                    yield f"{src_lang}-{tgt_lang}", segments[src_lang], translation
+        # <tu> yang sudah dibaca dibuang dari pohon supaya memori tetap kecil
+        element.clear()
+        if body is not None:
+            body.clear()
+
+
+def import_translation_memory(path, cache, pair=None, chunk_size=1000) -> int:
+    """Load a translation memory file into `cache`, optionally only one pair
+
+    Entries are written in chunks of `chunk_size` per `load_many` call, so
+    large files load without holding the whole file in memory. A tiered
+    cache only loads them into its fastest tier and a fuzzy cache does not
+    index them. Returns the number of entries read."""
+    count = 0
+    chunks = {}
+    for entry_pair, source, translation in iter_translation_memory(path):
+        if pair is not None and entry_pair != pair:
+            continue
+        chunk = chunks.setdefault(entry_pair, {})
+        chunk[source] = translation
+        count += 1
+        if len(chunk) >= chunk_size:
+            cache.load_many(entry_pair, chunks.pop(entry_pair))
+    for entry_pair, chunk in chunks.items():
+        cache.load_many(entry_pair, chunk)
+    return count
+
+
+def export_translation_memory(cache, path, pair=None) -> int:
+    """Write the entries of `cache` to a .tmx or JSONL translation memory, returns the count
+
+    The file is written to a temporary file next to `path` first and moved
+    over it at the end, so an interrupted export keeps the previous file and
+    concurrent exports do not write into each other."""
+    tmx = path.lower().endswith(".tmx")
+    count = 0
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    f = tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=directory, suffix=".tmp", delete=False)
+    try:
+        with f:
+            if tmx:
+                f.write('<?xml version="1.0" encoding="UTF-8"?>\n<tmx version="1.4">\n'
+                        '<header creationtool="screen-translator" creationtoolversion="1" datatype="plaintext" '
+                        'segtype="sentence" adminlang="en" srclang="*all*" o-tmf="cache"/>\n<body>\n')
+            for entry_pair, source, translation in cache.items(pair):
+                if tmx:
+                    src_lang, tgt_lang = entry_pair.split("-", 1)
+                    f.write(f'<tu srclang={quoteattr(src_lang)}>'
+                            f'<tuv xml:lang={quoteattr(src_lang)}><seg>{escape(source)}</seg></tuv>'
+                            f'<tuv xml:lang={quoteattr(tgt_lang)}><seg>{escape(translation)}</seg></tuv></tu>\n')
+                else:
+                    f.write(json.dumps({"pair": entry_pair, "source": source, "target": translation},
+                                       ensure_ascii=False) + "\n")
+                count += 1
+            if tmx:
+                f.write("</body>\n</tmx>\n")
+        os.replace(f.name, path)
+    except BaseException:
+        os.remove(f.name)
+        raise
+    return count
+
 
 language_name_list = [
     ("guw", "Gunwinggu"), ("ar", "Arabic"), ("ig", "Igbo"), ("gmq", "Germanic"), ("eu", "Basque"), ("yap", "Yapese"),
@@ -2485,4 +2745,5 @@ list_models = [
 
 language_to_id = {name: id for id, name in language_name_list}
 id_to_language = {id: name for id, name in language_name_list}
-source_language = {id_to_language[id] for id in language_pairs.keys()}
\ No newline at end of file
+# beberapa kode bahasa belum punya nama di language_name_list
+source_language = {id_to_language.get(id, id) for id in language_pairs.keys()}
\ No newline at end of file
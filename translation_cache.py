@@ -0,0 +1,566 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+import zlib
+from collections import Counter, OrderedDict, defaultdict
+
+import numpy as np
+
+try:
+    from rapidfuzz.distance import Levenshtein
+except ImportError:
+    Levenshtein = None
+
+CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'screen-translator')
+
+
+class TranslationCache:
+    """Base class of the cache tiers.
+
+    Entries are keyed by a language pair such as ``"en-id"`` plus the source
+    text. Backends implement `get` and `set`; the batch methods fall back to
+    one call per text. `persistent` tiers keep their entries after the
+    process exits."""
+
+    persistent = False
+
+    def get(self, pair, text):
+        raise NotImplementedError
+
+    def set(self, pair, text, translation):
+        raise NotImplementedError
+
+    def get_many(self, pair, texts) -> list:
+        return [self.get(pair, text) for text in texts]
+
+    def set_many(self, pair, translations):
+        for text, translation in translations.items():
+            self.set(pair, text, translation)
+
+    def load_many(self, pair, translations):
+        """Bulk write, e.g. from a translation memory, skipping entries already stored as given"""
+        existing = self.get_many(pair, list(translations))
+        self.set_many(pair, {text: translation for (text, translation), stored
+                             in zip(translations.items(), existing) if stored != translation})
+
+    def items(self, pair=None):
+        """Yield (pair, source, translation) of every entry, or of one pair"""
+        raise NotImplementedError(f"{type(self).__name__} cannot list its entries")
+
+
+class MemoryCache(TranslationCache):
+    def __init__(self, max_entries=10000):
+        """In-process LRU tier, answers hits without leaving Python
+
+        Parameters
+        ----------
+        max_entries : int
+            least recently used entries are evicted above this size"""
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, pair, text):
+        key = (pair, text)
+        with self.lock:
+            translation = self.entries.get(key)
+            if translation is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return translation
+
+    def set(self, pair, text, translation):
+        key = (pair, text)
+        with self.lock:
+            self.entries[key] = translation
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def load_many(self, pair, translations):
+        # menimpa di memori lebih murah daripada mengecek dulu, dan tidak mengubah hit rate
+        self.set_many(pair, translations)
+
+    def items(self, pair=None):
+        with self.lock:
+            entries = list(self.entries.items())
+        for (entry_pair, text), translation in entries:
+            if pair is None or entry_pair == pair:
+                yield entry_pair, text, translation
+
+    def __len__(self):
+        return len(self.entries)
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hit_rate,
+                "size": len(self), "max_entries": self.max_entries}
+
+
+# satu connection pool per server Redis, dipakai bersama oleh semua RedisCache
+_redis_pools = {}
+_redis_pools_lock = threading.Lock()
+
+
+def redis_pool(host='localhost', port=6379, db=0):
+    import redis
+
+    with _redis_pools_lock:
+        key = (host, port, db)
+        if key not in _redis_pools:
+            _redis_pools[key] = redis.ConnectionPool(host=host, port=port, db=db)
+        return _redis_pools[key]
+
+
+class RedisCache(TranslationCache):
+    persistent = True
+
+    def __init__(self, host='localhost', port=6379, db=0, ttl=None):
+        """Redis tier, shared between processes and hosts
+
+        A frame costs one MGET for all of its texts and one pipelined
+        round trip for the misses, over a connection pool shared by every
+        RedisCache pointing at the same server.
+
+        Parameters
+        ----------
+        ttl : int
+            seconds before an entry expires, None keeps it forever"""
+        import redis
+
+        self.client = redis.StrictRedis(connection_pool=redis_pool(host, port, db))
+        self.ttl = ttl
+
+    @staticmethod
+    def make_key(pair, text) -> str:
+        # Buat kunci cache unik berdasarkan teks dan pasangan bahasa
+        return "translation:" + hashlib.md5(f"{text}:{pair}".encode()).hexdigest()
+
+    def get(self, pair, text):
+        return self.get_many(pair, [text])[0]
+
+    def get_many(self, pair, texts) -> list:
+        if not texts:
+            return []
+        values = self.client.mget([self.make_key(pair, text) for text in texts])
+        return [value.decode('utf-8') if value is not None else None for value in values]
+
+    def set(self, pair, text, translation):
+        self.set_many(pair, {text: translation})
+
+    def set_many(self, pair, translations):
+        if not translations:
+            return
+        # SET ... EX menulis nilai dan TTL sekaligus, pipeline mengirim semuanya dalam satu round trip
+        pipeline = self.client.pipeline(transaction=False)
+        for text, translation in translations.items():
+            pipeline.set(self.make_key(pair, text), translation, ex=self.ttl)
+        pipeline.execute()
+
+
+class AsyncRedisCache:
+    def __init__(self, host='localhost', port=6379, db=0, ttl=None):
+        """asyncio variant of RedisCache with the same keys, for callers running an event loop
+
+        Every method is a coroutine; entries written here are read by
+        RedisCache and the other way around."""
+        import redis.asyncio
+
+        self.client = redis.asyncio.StrictRedis(host=host, port=port, db=db)
+        self.ttl = ttl
+
+    async def get(self, pair, text):
+        return (await self.get_many(pair, [text]))[0]
+
+    async def get_many(self, pair, texts) -> list:
+        if not texts:
+            return []
+        values = await self.client.mget([RedisCache.make_key(pair, text) for text in texts])
+        return [value.decode('utf-8') if value is not None else None for value in values]
+
+    async def set(self, pair, text, translation):
+        await self.set_many(pair, {text: translation})
+
+    async def set_many(self, pair, translations):
+        if not translations:
+            return
+        async with self.client.pipeline(transaction=False) as pipeline:
+            for text, translation in translations.items():
+                pipeline.set(RedisCache.make_key(pair, text), translation, ex=self.ttl)
+            await pipeline.execute()
+
+    async def close(self):
+        await self.client.aclose()
+
+
+class DiskCache(TranslationCache):
+    persistent = True
+
+    def __init__(self, path=None):
+        """SQLite tier, keeps translations across restarts
+
+        Parameters
+        ----------
+        path : str
+            database file, defaults to translations.sqlite3 in CACHE_DIR"""
+        if path is None:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            path = os.path.join(CACHE_DIR, 'translations.sqlite3')
+        self.path = path
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS translations ("
+                "pair TEXT NOT NULL, source TEXT NOT NULL, translation TEXT NOT NULL, "
+                "PRIMARY KEY (pair, source))")
+
+    def get(self, pair, text):
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT translation FROM translations WHERE pair = ? AND source = ?", (pair, text)).fetchone()
+        return row[0] if row else None
+
+    def set(self, pair, text, translation):
+        self.set_many(pair, {text: translation})
+
+    def set_many(self, pair, translations):
+        with self.lock, self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO translations (pair, source, translation) VALUES (?, ?, ?)",
+                [(pair, text, translation) for text, translation in translations.items()])
+
+    def items(self, pair=None):
+        query = "SELECT pair, source, translation FROM translations"
+        with self.lock:
+            cursor = (self.connection.execute(query + " WHERE pair = ?", (pair,)) if pair is not None
+                      else self.connection.execute(query))
+        while True:
+            with self.lock:
+                rows = cursor.fetchmany(1000)
+            if not rows:
+                break
+            yield from rows
+
+    def __len__(self):
+        with self.lock:
+            return self.connection.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+
+
+class TieredCache(TranslationCache):
+    def __init__(self, tiers):
+        """Chain of caches, fastest first
+
+        Lookups go down the tiers until one hits and the result is copied
+        into the faster tiers above it; writes go to every tier."""
+        self.tiers = list(tiers)
+
+    def get(self, pair, text):
+        return self.get_many(pair, [text])[0]
+
+    def get_many(self, pair, texts) -> list:
+        results = [None] * len(texts)
+        missing = list(range(len(texts)))
+        for level, tier in enumerate(self.tiers):
+            if not missing:
+                break
+            found = tier.get_many(pair, [texts[i] for i in missing])
+            hits = {texts[i]: translation for i, translation in zip(missing, found) if translation is not None}
+            for upper in self.tiers[:level]:
+                upper.set_many(pair, hits)
+            for i, translation in zip(missing, found):
+                results[i] = translation
+            missing = [i for i in missing if results[i] is None]
+        return results
+
+    def set(self, pair, text, translation):
+        self.set_many(pair, {text: translation})
+
+    def set_many(self, pair, translations):
+        if translations:
+            for tier in self.tiers:
+                tier.set_many(pair, translations)
+
+    @property
+    def persistent(self) -> bool:
+        return any(tier.persistent for tier in self.tiers)
+
+    def load_many(self, pair, translations):
+        # hanya ke tier tercepat untuk pemanasan; tier persisten sudah menyimpan terjemahannya sendiri
+        if translations and self.tiers:
+            self.tiers[0].load_many(pair, translations)
+
+    def items(self, pair=None):
+        # tier paling lambat biasanya yang paling lengkap, tier memori hanya menyimpan yang terbaru
+        for tier in reversed(self.tiers):
+            try:
+                yield from tier.items(pair)
+                return
+            except NotImplementedError:
+                continue
+        raise NotImplementedError("no cache tier can list its entries")
+
+    def stats(self) -> dict:
+        return self.tiers[0].stats() if self.tiers and hasattr(self.tiers[0], "stats") else {}
+
+
+# Karakter yang sering tertukar oleh OCR dipetakan ke satu bentuk
+OCR_CONFUSABLES = str.maketrans({"I": "l", "\u2018": "'", "\u2019": "'", "\u201c": '"', "\u201d": '"'})
+# Angka dan simbol yang mirip huruf hanya dilipat di dalam kata ("down1oad", "0pen", "|eft"),
+# supaya angka sungguhan seperti "Page 1 of 5" atau "10 minutes" tetap berbeda
+_LETTER = r"[^\W\d_]"
+OCR_CONFUSABLE_DIGITS = re.compile(rf"(?<={_LETTER})[01|](?!\d)|(?<!\d)[01|](?={_LETTER})|(?<={_LETTER})!(?={_LETTER})")
+OCR_DIGIT_LETTERS = {"0": "o", "1": "l", "|": "l", "!": "l"}
+
+
+def normalize_text(text) -> str:
+    """Fold OCR jitter: unicode forms, confusable glyphs, case, punctuation and spacing
+
+    A final ? or ! is kept, since it changes the meaning of the sentence."""
+    text = unicodedata.normalize("NFKC", text).translate(OCR_CONFUSABLES)
+    text = OCR_CONFUSABLE_DIGITS.sub(lambda match: OCR_DIGIT_LETTERS[match.group()], text).lower()
+    terminal = text.rstrip()[-1:]
+    text = " ".join(re.sub(r"[^\w\s']", "", text).split())
+    return text + terminal if terminal in ("?", "!") and text else text
+
+
+def protected_tokens(normalized) -> tuple:
+    """Parts of a normalized text a fuzzy match must keep exactly: its numbers and a final ? or !"""
+    return re.findall(r"\d+", normalized), normalized[-1:] if normalized[-1:] in ("?", "!") else ""
+
+
+def edit_similarity(a, b) -> float:
+    """1 - Levenshtein distance / length of the longer string
+
+    Uses rapidfuzz's C implementation when it is installed."""
+    if a == b:
+        return 1.0
+    if Levenshtein is not None:
+        return Levenshtein.normalized_similarity(a, b)
+    if len(a) < len(b):
+        a, b = b, a
+    if not b:
+        return 0.0
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return 1.0 - previous[-1] / len(a)
+
+
+class FuzzyIndex:
+    _PRIME = (1 << 61) - 1
+
+    def __init__(self, threshold=0.9, ngram=3, bands=16, rows=4, seed=1, max_entries=10000,
+                 max_candidates=16):
+        """Approximate text lookup: MinHash LSH over character n-grams
+
+        Candidates that share an LSH band are verified with edit distance
+        on the normalized text, so only near-identical strings match. With
+        4 rows per band a candidate needs roughly 0.5 n-gram Jaccard
+        similarity, about what a 0.9 edit similarity leaves on a short
+        sentence, and only the candidates sharing the most bands are
+        verified, so a miss costs the same on a full index of look-alike
+        UI texts.
+
+        Parameters
+        ----------
+        threshold : float
+            minimum `edit_similarity` of the normalized texts
+        ngram : int
+            character shingle length
+        bands, rows : int
+            LSH banding, the signature has bands * rows hashes
+        max_entries : int
+            least recently added or matched texts are dropped above this size
+        max_candidates : int
+            most candidates verified with edit distance per query"""
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.max_candidates = max_candidates
+        self.ngram = ngram
+        self.bands = bands
+        self.rows = rows
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, self._PRIME, bands * rows, dtype=np.uint64)
+        self.b = rng.integers(0, self._PRIME, bands * rows, dtype=np.uint64)
+        self.buckets = defaultdict(set)
+        # teks ter-normalisasi -> teks asli yang ada di cache
+        self.sources = OrderedDict()
+        self.lock = threading.Lock()
+
+    def signature(self, normalized):
+        padded = f" {normalized} "
+        shingles = {padded[i:i + self.ngram] for i in range(max(len(padded) - self.ngram + 1, 1))}
+        hashes = np.fromiter((zlib.crc32(s.encode()) for s in shingles), dtype=np.uint64, count=len(shingles))
+        # (a * x + b) mod p, x < 2**32 dan a < 2**61 bisa overflow uint64, cukup untuk hashing
+        return ((hashes[:, None] * self.a + self.b) % self._PRIME).min(axis=0)
+
+    def band_keys(self, pair, signature):
+        return [(pair, band, signature[band * self.rows:(band + 1) * self.rows].tobytes())
+                for band in range(self.bands)]
+
+    def add(self, pair, text):
+        normalized = normalize_text(text)
+        if not normalized:
+            return
+        with self.lock:
+            if (pair, normalized) in self.sources:
+                self.sources.move_to_end((pair, normalized))
+                return
+            self.sources[(pair, normalized)] = text
+            for key in self.band_keys(pair, self.signature(normalized)):
+                self.buckets[key].add(normalized)
+            while len(self.sources) > self.max_entries:
+                self.evict()
+
+    def evict(self):
+        (pair, normalized), _ = self.sources.popitem(last=False)
+        # band key dihitung ulang daripada disimpan, supaya memori per entri tetap kecil
+        for key in self.band_keys(pair, self.signature(normalized)):
+            bucket = self.buckets.get(key)
+            if bucket is not None:
+                bucket.discard(normalized)
+                if not bucket:
+                    del self.buckets[key]
+
+    def query(self, pair, text):
+        """Source text already in the index that `text` is a near copy of, or None"""
+        normalized = normalize_text(text)
+        if not normalized:
+            return None
+        keys = self.band_keys(pair, self.signature(normalized))
+        with self.lock:
+            if (pair, normalized) in self.sources:
+                self.sources.move_to_end((pair, normalized))
+                return self.sources[(pair, normalized)]
+            shared = Counter()
+            for key in keys:
+                shared.update(self.buckets.get(key, ()))
+
+        # verifikasi di luar lock, kandidat dengan band sama terbanyak paling mirip
+        best, best_score = None, self.threshold
+        protected = protected_tokens(normalized)
+        for candidate, _ in shared.most_common(self.max_candidates):
+            # angka atau tanda tanya/seru yang berbeda berarti teks yang berbeda
+            if protected_tokens(candidate) != protected:
+                continue
+            # beda panjang terlalu jauh tidak mungkin lolos threshold
+            if abs(len(candidate) - len(normalized)) > (1 - self.threshold) * max(len(candidate), len(normalized)):
+                continue
+            score = edit_similarity(candidate, normalized)
+            if score >= best_score:
+                best, best_score = candidate, score
+        if best is None:
+            return None
+        with self.lock:
+            # bisa saja sudah di-evict selama verifikasi
+            source = self.sources.get((pair, best))
+            if source is not None:
+                self.sources.move_to_end((pair, best))
+            return source
+
+    def __len__(self):
+        return len(self.sources)
+
+
+class FuzzyCache(TranslationCache):
+    def __init__(self, cache, threshold=0.9, max_entries=10000):
+        """Cache wrapper that tolerates OCR jitter in the source text
+
+        Exact misses are looked up again under the closest indexed source
+        text, see `FuzzyIndex`.
+
+        Parameters
+        ----------
+        cache : TranslationCache
+            cache holding the translations
+        threshold : float
+            minimum similarity of the normalized texts
+        max_entries : int
+            bound of the fuzzy index, only the most recently used source
+            texts can be matched approximately"""
+        self.cache = cache
+        self.index = FuzzyIndex(threshold, max_entries=max_entries)
+        self.fuzzy_hits = 0
+
+    def get(self, pair, text):
+        return self.get_many(pair, [text])[0]
+
+    def get_many(self, pair, texts) -> list:
+        results = self.cache.get_many(pair, texts)
+        for i, translation in enumerate(results):
+            if translation is None:
+                source = self.index.query(pair, texts[i])
+                if source is not None and source != texts[i]:
+                    results[i] = self.cache.get(pair, source)
+                    self.fuzzy_hits += results[i] is not None
+        return results
+
+    def set(self, pair, text, translation):
+        self.set_many(pair, {text: translation})
+
+    def set_many(self, pair, translations):
+        self.cache.set_many(pair, translations)
+        for text in translations:
+            self.index.add(pair, text)
+
+    @property
+    def persistent(self) -> bool:
+        return self.cache.persistent
+
+    def load_many(self, pair, translations):
+        # tidak diindeks, indeks fuzzy hanya untuk teks yang benar-benar terlihat di layar
+        self.cache.load_many(pair, translations)
+
+    def items(self, pair=None):
+        return self.cache.items(pair)
+
+    def stats(self) -> dict:
+        stats = self.cache.stats() if hasattr(self.cache, "stats") else {}
+        return dict(stats, fuzzy_hits=self.fuzzy_hits, fuzzy_index_size=len(self.index))
+
+
+def build_cache(backends=("memory",), **options) -> TranslationCache:
+    """Build the cache tiers named in `backends`, in lookup order
+
+    Parameters
+    ----------
+    backends : tuple
+        any of "memory", "redis", "disk", "lmdb"
+    options :
+        memory_entries, redis_host, redis_port, redis_db, redis_ttl, disk_path,
+        lmdb_path, lmdb_map_size, fuzzy_threshold (wraps the tiers in a FuzzyCache when set),
+        fuzzy_entries"""
+    tiers = []
+    for backend in backends:
+        if backend == "memory":
+            tiers.append(MemoryCache(options.get("memory_entries", 10000)))
+        elif backend == "redis":
+            tiers.append(RedisCache(options.get("redis_host", 'localhost'), options.get("redis_port", 6379),
+                                    options.get("redis_db", 0), options.get("redis_ttl")))
+        elif backend == "disk":
+            tiers.append(DiskCache(options.get("disk_path")))
+        elif backend == "lmdb":
+            from translation_store import LmdbCache
+
+            tiers.append(LmdbCache(options.get("lmdb_path"), options.get("lmdb_map_size", 512 * 2**20)))
+        else:
+            raise ValueError(f"Unknown cache backend '{backend}'")
+    cache = TieredCache(tiers)
+    if options.get("fuzzy_threshold") is not None:
+        return FuzzyCache(cache, options["fuzzy_threshold"], options.get("fuzzy_entries", 10000))
+    return cache
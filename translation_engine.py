@@ -0,0 +1,495 @@
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict, deque
+
+import torch
+from transformers import GenerationConfig, MarianConfig, MarianMTModel, MarianTokenizer
+
+from translation_cache import CACHE_DIR
+
+
+class TorchEngine:
+    def __init__(self, model_name, quantize=False, dtype=None, tokenizer=None):
+        """PyTorch eager Marian model, as shipped by Helsinki-NLP
+
+        Parameters
+        ----------
+        model_name : str
+            Hugging Face model id, e.g. Helsinki-NLP/opus-mt-en-id
+        quantize : bool
+            apply dynamic int8 quantization to the Linear layers, see
+            `load_quantized_model`
+        dtype : str
+            weight dtype such as "bfloat16", None keeps the checkpoint's fp32.
+            If generation fails because an op lacks a kernel for it, the
+            model is converted back to fp32 once and the batch is retried
+        tokenizer : MarianTokenizer
+            already loaded tokenizer of `model_name`, loaded here when None"""
+        if quantize and dtype is not None:
+            raise ValueError("quantize and dtype cannot be combined")
+        self.model_name = model_name
+        self.tokenizer = tokenizer if tokenizer is not None else MarianTokenizer.from_pretrained(model_name)
+        if quantize:
+            self.model = load_quantized_model(model_name)
+        else:
+            self.model = MarianMTModel.from_pretrained(model_name)
+            if dtype is not None:
+                self.model = self.model.to(getattr(torch, dtype))
+        self.model.eval()
+        self.resized = False
+
+    @property
+    def nbytes(self) -> int:
+        return model_nbytes(self.model)
+
+    def translate(self, texts, batch_size=16, **generate_kwargs) -> list:
+        try:
+            return translate_batch(self.model, self.tokenizer, texts, batch_size, **generate_kwargs)
+        except RuntimeError as e:
+            if self.model.dtype == torch.float32 or "not implemented for" not in str(e):
+                raise
+            print(f"{self.model.dtype} generate failed, falling back to float32: {e}")
+            self.model = self.model.float()
+            # ukurannya berubah, ModelRegistry menghitung ulang saat engine ini dipakai lagi
+            self.resized = True
+            return translate_batch(self.model, self.tokenizer, texts, batch_size, **generate_kwargs)
+
+
+class CTranslate2Engine:
+    def __init__(self, model_name, quantization="int8", threads=0, tokenizer=None):
+        """Marian model converted once to CTranslate2 and run on its CPU runtime
+
+        The converted model is stored in CACHE_DIR/ctranslate2 and reused by
+        later startups.
+
+        Parameters
+        ----------
+        model_name : str
+            Hugging Face model id, e.g. Helsinki-NLP/opus-mt-en-id
+        quantization : str
+            CTranslate2 weight type, e.g. int8, int8_float32, float32
+        threads : int
+            intra-op threads, 0 lets CTranslate2 decide
+        tokenizer : MarianTokenizer
+            already loaded tokenizer of `model_name`, loaded here when None"""
+        import ctranslate2
+
+        self.model_name = model_name
+        self.tokenizer = tokenizer if tokenizer is not None else MarianTokenizer.from_pretrained(model_name)
+        self.model_dir = convert_to_ctranslate2(model_name, quantization)
+        self.translator = ctranslate2.Translator(self.model_dir, device="cpu", compute_type=quantization,
+                                                 intra_threads=threads)
+
+    @property
+    def nbytes(self) -> int:
+        # bobot dimuat utuh ke RAM, jadi ukuran file di disk cukup mendekati
+        return sum(entry.stat().st_size for entry in os.scandir(self.model_dir) if entry.is_file())
+
+    def translate(self, texts, batch_size=16, num_beams=None, max_new_tokens=None, **generate_kwargs) -> list:
+        unique = list(dict.fromkeys(text for text in texts if text.strip()))
+        if not unique:
+            return ["" for _ in texts]
+
+        tokens = [self.tokenizer.convert_ids_to_tokens(self.tokenizer.encode(text, truncation=True)) for text in unique]
+        options = {}
+        if num_beams is not None:
+            options["beam_size"] = num_beams
+        if max_new_tokens is not None:
+            options["max_decoding_length"] = max_new_tokens
+        # CTranslate2 sudah mengurutkan input berdasarkan panjang di dalam max_batch_size
+        results = self.translator.translate_batch(tokens, max_batch_size=batch_size, **options)
+
+        translations = {}
+        for text, result in zip(unique, results):
+            ids = self.tokenizer.convert_tokens_to_ids(result.hypotheses[0])
+            translations[text] = self.tokenizer.decode(ids, skip_special_tokens=True)
+        return [translations.get(text, "") for text in texts]
+
+
+ENGINES = {
+    "torch": TorchEngine,
+    "ctranslate2": CTranslate2Engine,
+}
+
+
+def create_engine(name, model_name, **options):
+    """Instantiate the engine registered under `name` in ENGINES"""
+    if name not in ENGINES:
+        raise ValueError(f"Unknown translation engine '{name}'")
+    return ENGINES[name](model_name, **options)
+
+
+class ModelRegistry:
+    def __init__(self, max_bytes=None, engine="torch", **engine_options):
+        """Translation engines for several language pairs, loaded on first use
+
+        Loaded engines are kept so switching back to a pair is free, until
+        their total `nbytes` goes over `max_bytes`; then the least recently
+        used ones are unloaded. Sizes are measured at load and again when an
+        engine sets `resized`, e.g. after the float32 fallback of
+        TorchEngine. Tokenizers are small and are kept after their model is
+        unloaded, so reloading a pair only reads the weights again.
+
+        Parameters
+        ----------
+        max_bytes : int
+            RAM budget of the loaded models, None never unloads. The most
+            recently used model is always kept, even when it alone is larger
+        engine : str
+            engine from ENGINES used for every pair, `engine_options` are
+            passed to it"""
+        self.max_bytes = max_bytes
+        self.engine = engine
+        self.engine_options = engine_options
+        self.engines = OrderedDict()
+        self.sizes = {}
+        self.tokenizers = {}
+        # model yang sedang dimuat -> Event yang di-set setelah selesai
+        self.loading = {}
+        self.loads = 0
+        self.evictions = 0
+        self.lock = threading.RLock()
+
+    def get(self, model_name):
+        """Engine of `model_name`, loading it (and unloading others) when needed
+
+        The weights are read without holding the registry lock, so models
+        that are already loaded stay usable while another one loads. A
+        second caller of the model being loaded waits for that load."""
+        while True:
+            with self.lock:
+                engine = self.engines.get(model_name)
+                if engine is not None:
+                    self.engines.move_to_end(model_name)
+                    if getattr(engine, "resized", False):
+                        # model membesar setelah dimuat, cek lagi budget-nya
+                        engine.resized = False
+                        self.sizes[model_name] = engine.nbytes
+                        self.evict()
+                    return engine
+                event = self.loading.get(model_name)
+                if event is None:
+                    event = self.loading[model_name] = threading.Event()
+                    break
+            # thread lain sedang memuat model ini; kalau gagal, coba muat sendiri
+            event.wait()
+
+        try:
+            engine = create_engine(self.engine, model_name, tokenizer=self.tokenizer(model_name),
+                                   **self.engine_options)
+            nbytes = engine.nbytes
+            with self.lock:
+                self.engines[model_name] = engine
+                self.sizes[model_name] = nbytes
+                self.loads += 1
+                self.evict()
+        finally:
+            with self.lock:
+                del self.loading[model_name]
+            event.set()
+        return engine
+
+    def tokenizer(self, model_name):
+        with self.lock:
+            tokenizer = self.tokenizers.get(model_name)
+        if tokenizer is None:
+            tokenizer = MarianTokenizer.from_pretrained(model_name)
+            with self.lock:
+                tokenizer = self.tokenizers.setdefault(model_name, tokenizer)
+        return tokenizer
+
+    def evict(self):
+        with self.lock:
+            while self.max_bytes is not None and len(self.engines) > 1 and self.nbytes > self.max_bytes:
+                model_name, _ = self.engines.popitem(last=False)
+                del self.sizes[model_name]
+                self.evictions += 1
+                print(f"unloaded {model_name} to stay under {self.max_bytes / 2**20:.0f} MB")
+
+    def unload(self, model_name):
+        with self.lock:
+            if self.engines.pop(model_name, None) is not None:
+                del self.sizes[model_name]
+
+    @property
+    def nbytes(self) -> int:
+        return sum(self.sizes.values())
+
+    def __contains__(self, model_name):
+        return model_name in self.engines
+
+    def __len__(self):
+        return len(self.engines)
+
+    def stats(self) -> dict:
+        return {"loaded": list(self.engines), "nbytes": self.nbytes, "max_bytes": self.max_bytes,
+                "loads": self.loads, "evictions": self.evictions}
+
+
+IDLE, LOADING, READY, FAILED = "idle", "loading", "ready", "failed"
+
+
+class ModelHandle:
+    def __init__(self, registry, model_name):
+        """Lazily loaded engine of one model with a readiness state for the UI
+
+        Nothing is loaded until `get` or `warm_up` is called. `state` is one
+        of IDLE, LOADING, READY or FAILED and goes back to IDLE when the
+        registry unloads the model.
+
+        Parameters
+        ----------
+        registry : ModelRegistry
+            registry that loads and owns the engine
+        model_name : str
+            Hugging Face model id, e.g. Helsinki-NLP/opus-mt-en-id"""
+        self.registry = registry
+        self.model_name = model_name
+        self._state = IDLE
+        self.error = None
+        self.thread = None
+        self.lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self._state == READY and self.model_name not in self.registry:
+            return IDLE
+        return self._state
+
+    @property
+    def ready(self) -> bool:
+        return self.state == READY
+
+    def get(self):
+        """Engine of the model, loading it in the calling thread when needed"""
+        if self._state != READY:
+            self._state = LOADING
+        try:
+            engine = self.registry.get(self.model_name)
+        except Exception as e:
+            self._state, self.error = FAILED, e
+            raise
+        self._state, self.error = READY, None
+        return engine
+
+    def warm_up(self, text="Hello."):
+        """Load the model and run one dummy translation on a background thread
+
+        The first generate call also pays for lazy allocations inside torch,
+        so the first real frame does not. Returns the thread, calling it again
+        while a warm-up is running returns the running one."""
+        with self.lock:
+            if self.thread is not None and self.thread.is_alive():
+                return self.thread
+            self._state = LOADING
+            self.thread = threading.Thread(target=self._warm_up, args=(text,), daemon=True)
+            self.thread.start()
+            return self.thread
+
+    def _warm_up(self, text):
+        try:
+            start = time.perf_counter()
+            self.get().translate([text])
+            print(f"{self.model_name} ready in {time.perf_counter() - start:.1f} s")
+        except Exception as e:
+            print(f"warm-up of {self.model_name} failed: {e}")
+
+
+# Dari kualitas terbaik ke tercepat; num_beams=1 adalah greedy
+DECODING_LEVELS = [
+    {"num_beams": 4, "max_new_tokens": 256},
+    {"num_beams": 2, "max_new_tokens": 192},
+    {"num_beams": 1, "max_new_tokens": 128},
+    {"num_beams": 1, "max_new_tokens": 64},
+]
+
+
+class DecodingController:
+    def __init__(self, budget_ms=400, levels=DECODING_LEVELS, headroom=0.7, smoothing=0.3, history=200):
+        """Picks decoding parameters per request to keep translation within a time budget
+
+        The cost of a request is estimated as ms per decoding unit, where a
+        unit is one expected output token of one beam, and learned from the
+        measured latency of every request (exponential moving average). Each
+        request gets the best level of `levels` whose predicted time fits
+        `budget_ms`, so long paragraphs and a slow machine fall back to
+        fewer beams and greedy search, and short ones get beam search again.
+
+        Callers that know which frame a request belongs to pass the frame's
+        deadline instead, so every batch of a frame shares one budget.
+
+        Parameters
+        ----------
+        budget_ms : float
+            translation time allowed per frame
+        levels : list
+            generate kwargs from best quality to fastest
+        headroom : float
+            a better level than the current one is only chosen when its
+            prediction is under `headroom * budget_ms`, so the choice does
+            not flip every frame
+        smoothing : float
+            weight of the newest measurement in the moving average
+        history : int
+            recent choices kept for `choices` and `stats`"""
+        self.budget_ms = budget_ms
+        self.levels = levels
+        self.headroom = headroom
+        self.smoothing = smoothing
+        self.ms_per_unit = None
+        self.level = 0
+        self.lock = threading.Lock()
+        # (waktu, level, jumlah teks, prediksi ms, aktual ms)
+        self.choices = deque(maxlen=history)
+
+    @staticmethod
+    def expected_tokens(text) -> int:
+        # kira-kira 1.5 subword per kata untuk SentencePiece Marian
+        return int(len(text.split()) * 1.5) + 2
+
+    def units(self, texts, level) -> int:
+        params = self.levels[level]
+        return params["num_beams"] * sum(min(self.expected_tokens(text), params["max_new_tokens"]) for text in texts)
+
+    def predict(self, texts, level) -> float:
+        return 0.0 if self.ms_per_unit is None else self.ms_per_unit * self.units(texts, level)
+
+    def remaining_ms(self, deadline=None) -> float:
+        """Time left until `deadline` (time.monotonic()), `budget_ms` when there is none"""
+        return self.budget_ms if deadline is None else (deadline - time.monotonic()) * 1000
+
+    def choose(self, texts, budget_ms=None) -> int:
+        """Index into `levels` for translating `texts` now within `budget_ms`, defaults to `self.budget_ms`"""
+        budget_ms = self.budget_ms if budget_ms is None else budget_ms
+        with self.lock:
+            if self.ms_per_unit is None:
+                # belum ada pengukuran, mulai dari kualitas terbaik
+                return 0
+            for level in range(len(self.levels)):
+                limit = budget_ms * (self.headroom if level < self.level else 1.0)
+                if self.predict(texts, level) <= limit:
+                    break
+            self.level = level
+            return level
+
+    def record(self, texts, level, elapsed_ms):
+        with self.lock:
+            predicted = self.predict(texts, level)
+            ms_per_unit = elapsed_ms / max(self.units(texts, level), 1)
+            self.ms_per_unit = (ms_per_unit if self.ms_per_unit is None
+                                else self.smoothing * ms_per_unit + (1 - self.smoothing) * self.ms_per_unit)
+            self.choices.append((time.time(), level, len(texts), predicted, elapsed_ms))
+
+    def translate(self, engine, texts, deadline=None, level=None) -> tuple:
+        """`engine.translate(texts)` with the chosen decoding parameters, timing it for later choices
+
+        `deadline` is the time.monotonic() by which the whole frame should
+        be translated; batches of one frame share it, so later batches get
+        what the earlier ones left, and math.inf always gets the best
+        level. Without one every call gets `budget_ms`. `level` skips the
+        choice, e.g. 0 to redo a degraded translation. Returns the
+        translations and the level used, anything above 0 is a degraded
+        translation the caller should not persist."""
+        if level is None:
+            level = self.choose(texts, self.remaining_ms(deadline))
+        start = time.perf_counter()
+        translations = engine.translate(texts, **self.levels[level])
+        self.record(texts, level, (time.perf_counter() - start) * 1000)
+        return translations, level
+
+    def stats(self) -> dict:
+        with self.lock:
+            choices = list(self.choices)
+        counts = [sum(choice[1] == level for choice in choices) for level in range(len(self.levels))]
+        over = sum(choice[4] > self.budget_ms for choice in choices)
+        return {"level": self.level, "params": self.levels[self.level], "requests_per_level": counts,
+                "over_budget": over, "ms_per_unit": self.ms_per_unit}
+
+
+def convert_to_ctranslate2(model_name, quantization="int8") -> str:
+    """Convert a Hugging Face Marian checkpoint once and return the converted directory"""
+    output_dir = os.path.join(CACHE_DIR, "ctranslate2", f"{model_name.replace('/', '--')}-{quantization}")
+    if not os.path.exists(os.path.join(output_dir, "model.bin")):
+        import ctranslate2
+
+        converter = ctranslate2.converters.TransformersConverter(model_name)
+        converter.convert(output_dir, quantization=quantization, force=True)
+    return output_dir
+
+
+def quantize_linear_layers(model):
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def load_quantized_model(model_name):
+    """Marian model with int8 dynamic quantized Linear layers
+
+    The first load quantizes the fp32 checkpoint and saves the quantized
+    state dict in CACHE_DIR/quantized, under a name that includes the torch
+    version. Later loads build the quantized module structure from the
+    config and load that state dict directly (tensors only, no pickled
+    objects), skipping the fp32 weights and the conversion. A file that
+    cannot be loaded is quantized and written again."""
+    path = os.path.join(CACHE_DIR, "quantized", f"{model_name.replace('/', '--')}-int8-torch{torch.__version__}.pt")
+    if os.path.exists(path):
+        try:
+            model = quantize_linear_layers(MarianMTModel(MarianConfig.from_pretrained(model_name)))
+            model.load_state_dict(torch.load(path, weights_only=True))
+            try:
+                model.generation_config = GenerationConfig.from_pretrained(model_name)
+            except OSError:
+                pass
+            return model
+        except Exception as e:
+            print(f"cannot load {path}, quantizing {model_name} again: {e}")
+
+    model = quantize_linear_layers(MarianMTModel.from_pretrained(model_name))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # tulis ke file sementara dulu, supaya proses lain tidak membaca file yang setengah jadi
+    with tempfile.NamedTemporaryFile(dir=os.path.dirname(path), suffix=".tmp", delete=False) as f:
+        torch.save(model.state_dict(), f)
+    os.replace(f.name, path)
+    return model
+
+
+def model_nbytes(model) -> int:
+    """Bytes held by the model's tensors, counting shared and packed int8 weights once"""
+    seen = set()
+    total = 0
+    values = list(model.state_dict().values())
+    while values:
+        value = values.pop()
+        if isinstance(value, (tuple, list)):
+            values.extend(value)
+        elif isinstance(value, torch.Tensor) and value.data_ptr() not in seen:
+            seen.add(value.data_ptr())
+            total += value.numel() * value.element_size()
+    return total
+
+
+def translate_batch(model, tokenizer, texts, batch_size=16, **generate_kwargs) -> list:
+    """Translate `texts` with one padded `model.generate` call per bucket
+
+    Texts are tokenized once, sorted by token length and cut into buckets
+    of `batch_size`, so each bucket pads to similar lengths. Empty and
+    repeated strings are only translated once. Results follow input order."""
+    unique = list(dict.fromkeys(text for text in texts if text.strip()))
+    if not unique:
+        return ["" for _ in texts]
+
+    encoded = tokenizer(unique, truncation=True)
+    order = sorted(range(len(unique)), key=lambda i: len(encoded["input_ids"][i]))
+
+    translations = {}
+    for start in range(0, len(order), batch_size):
+        bucket = order[start:start + batch_size]
+        batch = tokenizer.pad({"input_ids": [encoded["input_ids"][i] for i in bucket],
+                               "attention_mask": [encoded["attention_mask"][i] for i in bucket]},
+                              return_tensors="pt")
+        output = model.generate(**batch, **generate_kwargs)
+        for i, text in zip(bucket, tokenizer.batch_decode(output, skip_special_tokens=True)):
+            translations[unique[i]] = text
+
+    return [translations.get(text, "") for text in texts]
@@ -0,0 +1,224 @@
+"""Persistent translation store on LMDB, shared by every translator process on the host.
+
+Inspect or maintain it with
+
+    python translation_store.py stats
+    python translation_store.py dump --pair en-id --limit 20
+    python translation_store.py compact
+"""
+import argparse
+import hashlib
+import os
+import shutil
+import threading
+import unicodedata
+
+from translation_cache import CACHE_DIR, TranslationCache
+
+STORE_PATH = os.path.join(CACHE_DIR, 'translations.lmdb')
+# batas ukuran key di LMDB adalah 511 byte
+MAX_KEY_BYTES = 511
+# LMDB tidak boleh membuka environment yang sama dua kali dalam satu proses,
+# jadi realpath -> [environment, jumlah LmdbCache yang memakainya]
+_environments = {}
+_environments_lock = threading.Lock()
+
+
+def normalize_source(text) -> str:
+    """Unicode NFC with runs of whitespace collapsed, so re-wrapped OCR text shares one entry"""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def store_key(pair, source) -> bytes:
+    key = f"{pair}\t{source}".encode("utf-8")
+    if len(key) > MAX_KEY_BYTES:
+        # teks panjang disimpan di bawah hash-nya, teks aslinya tetap ada di value
+        key = f"{pair}\t#".encode("utf-8") + hashlib.blake2b(key, digest_size=32).digest()
+    return key
+
+
+class LmdbCache(TranslationCache):
+    persistent = True
+
+    def __init__(self, path=None, map_size=512 * 2**20, readonly=False):
+        """Memory-mapped tier, keeps translations across restarts and processes
+
+        Keys are the language pair plus the source text after
+        `normalize_source`. Values hold the normalized source and the
+        translation, so the store can be listed and exported. Any number of
+        processes can read at once straight from the shared page cache;
+        LMDB serializes the writers.
+
+        Parameters
+        ----------
+        path : str
+            environment directory, defaults to `STORE_PATH`
+        map_size : int
+            maximum size of the store in bytes. Writes that do not fit are
+            dropped and counted in `dropped_writes`, see `compact`
+        readonly : bool
+            open without write access, e.g. for inspection"""
+        if path is None:
+            path = STORE_PATH
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.key = os.path.realpath(path)
+        self.map_size = map_size
+        self.readonly = readonly
+        self.lock = threading.Lock()
+        self.dropped_writes = 0
+        self.open()
+
+    def open_environment(self):
+        import lmdb
+
+        # readahead dimatikan karena akses cache acak, bukan berurutan
+        return lmdb.open(self.path, map_size=self.map_size, readonly=self.readonly,
+                         readahead=False, max_readers=256)
+
+    def open(self):
+        with _environments_lock:
+            if self.key not in _environments:
+                _environments[self.key] = [self.open_environment(), 0]
+            _environments[self.key][1] += 1
+
+    @property
+    def env(self):
+        # dibaca dari _environments tiap kali, supaya semua instance ikut environment baru setelah compact
+        return _environments[self.key][0]
+
+    def get(self, pair, text):
+        return self.get_many(pair, [text])[0]
+
+    def get_many(self, pair, texts) -> list:
+        results = []
+        # buffers=True membaca langsung dari memory map tanpa menyalin ke bytes
+        with self.env.begin(buffers=True) as txn:
+            for text in texts:
+                value = txn.get(store_key(pair, normalize_source(text)))
+                results.append(str(value, "utf-8").split("\0", 1)[1] if value is not None else None)
+        return results
+
+    def set(self, pair, text, translation):
+        self.set_many(pair, {text: translation})
+
+    def set_many(self, pair, translations):
+        import lmdb
+
+        if not translations or self.readonly:
+            return
+        try:
+            with self.lock, self.env.begin(write=True) as txn:
+                for text, translation in translations.items():
+                    source = normalize_source(text)
+                    txn.put(store_key(pair, source), f"{source}\0{translation}".encode("utf-8"))
+        except lmdb.MapFullError:
+            if not self.dropped_writes:
+                print(f"translation store {self.path} is full ({self.map_size / 2**20:.0f} MB), "
+                      f"new translations are not persisted")
+            self.dropped_writes += len(translations)
+
+    def items(self, pair=None):
+        """Yield (pair, source, translation) of every entry, or of one pair"""
+        prefix = f"{pair}\t".encode("utf-8") if pair is not None else b""
+        with self.env.begin() as txn:
+            cursor = txn.cursor()
+            if not cursor.set_range(prefix):
+                return
+            for key, value in cursor:
+                if not key.startswith(prefix):
+                    break
+                source, translation = value.decode("utf-8").split("\0", 1)
+                yield key.decode("utf-8", "replace").split("\t", 1)[0], source, translation
+
+    def __len__(self):
+        return self.env.stat()["entries"]
+
+    def stats(self) -> dict:
+        stat = self.env.stat()
+        used = stat["psize"] * (stat["branch_pages"] + stat["leaf_pages"] + stat["overflow_pages"])
+        return {"entries": stat["entries"], "used_bytes": used, "map_size": self.env.info()["map_size"],
+                "file_bytes": os.path.getsize(os.path.join(self.path, "data.mdb")),
+                "dropped_writes": self.dropped_writes}
+
+    def compact(self):
+        """Rewrite the store without free pages and shrink the file
+
+        Deleted and overwritten entries leave free pages that LMDB reuses but
+        never returns to the file system. Other LmdbCache instances of this
+        process switch to the compacted environment, but only run this while
+        no other process has the store open."""
+        with self.lock, _environments_lock:
+            compacted = self.path + ".compact"
+            shutil.rmtree(compacted, ignore_errors=True)
+            os.makedirs(compacted)
+            self.env.copy(compacted, compact=True)
+            self.env.close()
+            for name in os.listdir(compacted):
+                os.replace(os.path.join(compacted, name), os.path.join(self.path, name))
+            os.rmdir(compacted)
+            _environments[self.key][0] = self.open_environment()
+
+    def clear(self, pair=None):
+        with self.lock, self.env.begin(write=True) as txn:
+            if pair is None:
+                txn.drop(self.env.open_db(txn=txn), delete=False)
+                return
+            prefix = f"{pair}\t".encode("utf-8")
+            cursor = txn.cursor()
+            if cursor.set_range(prefix):
+                while cursor.key().startswith(prefix) and cursor.delete():
+                    pass
+
+    def close(self):
+        """Release this instance, the environment closes with its last user"""
+        with _environments_lock:
+            entry = _environments.get(self.key)
+            if entry is None:
+                return
+            entry[1] -= 1
+            if entry[1] <= 0:
+                del _environments[self.key]
+                entry[0].close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("command", choices=["stats", "get", "dump", "compact", "clear"])
+    parser.add_argument("text", nargs="?", help="get: source text to look up")
+    parser.add_argument("--path", help="store directory, defaults to CACHE_DIR/translations.lmdb")
+    parser.add_argument("--pair", help="language pair such as en-id")
+    parser.add_argument("--limit", type=int, default=None, help="dump: most entries to print")
+    parser.add_argument("--map-size-mb", type=int, default=512)
+    args = parser.parse_intermixed_args()
+
+    path = args.path if args.path is not None else STORE_PATH
+    if args.command in ("stats", "get", "dump") and not os.path.exists(os.path.join(path, "data.mdb")):
+        # belum ada terjemahan yang disimpan, jangan buat store baru hanya untuk membacanya
+        print(f"no translation store at {path} yet, it has 0 entries")
+        return
+
+    store = LmdbCache(args.path, args.map_size_mb * 2**20, readonly=args.command in ("stats", "get", "dump"))
+    if args.command == "stats":
+        for name, value in store.stats().items():
+            print(f"{name:>15} {value}")
+    elif args.command == "get":
+        if args.pair is None or args.text is None:
+            parser.error("get needs --pair and a source text")
+        print(store.get(args.pair, args.text))
+    elif args.command == "dump":
+        for i, (pair, source, translation) in enumerate(store.items(args.pair)):
+            if args.limit is not None and i >= args.limit:
+                break
+            print(f"{pair}\t{source}\t{translation}")
+    elif args.command == "compact":
+        before = store.stats()["file_bytes"]
+        store.compact()
+        print(f"{before / 2**20:.1f} MB -> {store.stats()['file_bytes'] / 2**20:.1f} MB")
+    elif args.command == "clear":
+        store.clear(args.pair)
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
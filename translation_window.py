@@ -3,16 +3,19 @@ import threading
 import pyautogui
 import pygetwindow as gw
 from PIL import ImageTk, Image
-from process_image import Tesserract, OEM_OPTION, PSM_OPTION, overlay_translated_text
+from process_image import Tesserract, OEM_OPTION, PSM_OPTION, DirtyRegionOCR, FrameChangeDetector, create_ocr, overlay_translated_text, set_language_pair, ProgressiveOverlay, save_translation_memory, phrase_history, speculative_translator
+from pretranslator import app_name
 import time
 
 class TranslationWindow:
-    def __init__(self, app, target_window):
+    def __init__(self, app, target_window, change_tolerance=8):
         self.app = app
         self.window = target_window
         self.root = app.root
         
         self.translating = False
+        # lewati OCR kalau isi window tidak berubah
+        self.change_detector = FrameChangeDetector(tolerance=change_tolerance)
         self.init_ui(self.window)
 
     def init_ui(self, target_window):
@@ -51,29 +54,58 @@ class TranslationWindow:
         self.start_translation()
 
     def start_translation(self, target_window):
-        ocr = Tesserract(OEM_OPTION.oem_3, PSM_OPTION.psm_3)
-        self.screenshot_thread = threading.Thread(target=self.update_screenshot, args=(ocr, self.window, ))
+        translator = set_language_pair(self.app.main_window.src_lang_var.get(), self.app.main_window.tgt_lang_var.get())
+        # teks yang biasa muncul di aplikasi ini diterjemahkan sebelum dibutuhkan
+        self.app_name = app_name(self.window.title)
+        speculative_translator.start(self.app_name, translator)
+        ocr = DirtyRegionOCR(create_ocr(OEM_OPTION.oem_3, PSM_OPTION.psm_3))
+        # terjemahan diisi belakangan oleh translation worker
+        self.overlay = ProgressiveOverlay(ocr, translator=translator)
+        self.screenshot_thread = threading.Thread(target=self.update_screenshot, args=(self.overlay, self.window, ))
         self.screenshot_thread.start()
         self.root.protocol("WM_DELETE_WINDOW", lambda : self.screenshot_thread.join())
         
-    def update_screenshot(self, ocr, selected_window):
+    def update_screenshot(self, overlay, selected_window):
         while True:
             # try:
                 time.sleep(0.1)
                 screenshot = pyautogui.screenshot(region=selected_window.box)
-                image = overlay_translated_text(screenshot, ocr)
-                image = Image.fromarray(image)
-                screenshot = ImageTk.PhotoImage(image)
-                
-                self.screenshot_label.config(image=screenshot)
-                self.screenshot_label.image = screenshot
+                if self.change_detector.has_changed(screenshot):
+                    image = overlay.update(screenshot, self.cursor_position(selected_window))
+                    phrase_history.record(self.app_name, overlay.paragraphs['text'])
+                elif overlay.has_updates():
+                    image = overlay.render()
+                else:
+                    image = None
+                if image is not None:
+                    image = Image.fromarray(image)
+                    screenshot = ImageTk.PhotoImage(image)
+                    
+                    self.screenshot_label.config(image=screenshot)
+                    self.screenshot_label.image = screenshot
                 time.sleep(0.4)
-                print("thread is running")
+                stats = overlay.worker.stats()
+                print(f"thread is running, skipped {self.change_detector.skipped_frames}/{self.change_detector.total_frames} frames, "
+                      f"cancelled {stats['cancelled']} stale translations ({stats['stale']} finished after leaving the screen), "
+                      f"shed {stats['shed']} low priority ones")
             # except e:
             #     print("thread stopped")
     
+    def cursor_position(self, selected_window):
+        """Mouse position inside the captured window, None when it is outside"""
+        x, y = pyautogui.position()
+        left, top, width, height = selected_window.box
+        if left <= x < left + width and top <= y < top + height:
+            return x - left, y - top
+        return None
+
     def stop_translation(self):
         self.translating = False
+        self.overlay.close()
+        speculative_translator.stop()
+        # simpan terjemahan dan riwayat teks sesi ini untuk sesi berikutnya
+        threading.Thread(target=save_translation_memory).start()
+        threading.Thread(target=phrase_history.save).start()
         self.selected_window_title.set("")
         self.root.deiconify()
         self.translation_window.destroy()
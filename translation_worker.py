@@ -0,0 +1,304 @@
+import heapq
+import itertools
+import threading
+import time
+import weakref
+from collections import deque
+from concurrent.futures import Future
+
+import numpy as np
+
+
+class TranslationWorker:
+    def __init__(self, max_batch_size=16, max_wait_ms=10, max_queued=None, refine_after=1.0, refine_batch_size=4):
+        """Background thread that runs translations and hands out futures
+
+        The capture loop submits paragraph texts and keeps going; the worker
+        takes the most important requests first, translates them with one
+        `translate_batch` call per translator and completes the futures.
+        One worker is meant to be shared by every translated window: after
+        the first request arrives it waits up to `max_wait_ms` for more, so
+        requests from several frames and windows share one padded batch.
+        Texts already in the translator's cache get a finished future right
+        away, and a text that is already queued shares its pending future.
+
+        Callers report the texts visible in their latest frame with
+        `set_live`; queued requests no longer visible to any caller are
+        cancelled. A translation that is already running cannot be stopped,
+        it finishes into the cache and is counted as `stale`.
+
+        Requests can carry the deadline of their frame, which is passed to
+        `translate_batch` so one frame shares one decoding budget. Once
+        nothing has been queued for `refine_after` seconds, the worker
+        translates the provisional (degraded) translations of its
+        translators again at the best level, `refine_batch_size` at a time.
+
+        Parameters
+        ----------
+        max_batch_size : int
+            most texts taken from the queue for one batch, a full batch
+            starts without waiting
+        max_wait_ms : float
+            how long a batch waits to fill up, 0 translates whatever is
+            queued right away
+        max_queued : int
+            when a batch is taken and more than this many requests are
+            still queued, the lowest priority ones that an earlier batch
+            already passed over are cancelled and counted as `shed`. None
+            keeps every request
+        refine_after : float
+            idle seconds before provisional translations are refined,
+            None never refines
+        refine_batch_size : int
+            provisional translations refined per batch, keeps a new frame
+            from waiting behind a long one"""
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.max_queued = max_queued
+        self.refine_after = refine_after
+        self.refine_batch_size = refine_batch_size
+        # heap berisi (-priority, urutan, translator, teks, future)
+        self.heap = []
+        self.sequence = itertools.count()
+        # (pasangan bahasa, teks) -> Future yang belum selesai dan prioritas tertingginya
+        self.pending = {}
+        self.priorities = {}
+        self.submitted = {}
+        self.deadlines = {}
+        # translator yang pernah dipakai, untuk refine saat idle
+        self.translators = weakref.WeakSet()
+        self.lock = threading.RLock()
+        self.condition = threading.Condition(self.lock)
+        # owner -> (pasangan bahasa, teks) yang masih terlihat di frame terakhirnya
+        self.live = {}
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.stale = 0
+        self.shed = 0
+        self.refined = 0
+        # ukuran batch dan latensi (submit sampai selesai, ms) terakhir
+        self.batch_sizes = deque(maxlen=1000)
+        self.latencies = deque(maxlen=1000)
+        # waktu batch terakhir selesai, untuk pekerjaan yang hanya jalan saat idle
+        self.last_busy = time.monotonic()
+        # waktu batch terakhir diambil; request yang lebih lama sudah pernah dilewati
+        self.last_batch = time.perf_counter()
+        self.active = False
+        self.running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def submit(self, translator, text, priority=0.0, deadline=None) -> Future:
+        """Future of the translation of `text` by `translator` (a `translation.MarianMT`)"""
+        return self.submit_many(translator, [text], [priority], deadline)[0]
+
+    def submit_many(self, translator, texts, priorities=None, deadline=None) -> list:
+        """Futures of `texts`, higher `priorities` are translated first
+
+        `deadline` is the time.monotonic() by which the frame of `texts`
+        should be translated, see `DecodingController.translate`"""
+        texts = list(texts)
+        futures = [None] * len(texts)
+        for i, translation in enumerate(translator.lookup(texts)):
+            if translation is not None:
+                futures[i] = Future()
+                futures[i].set_result(translation)
+
+        with self.condition:
+            self.translators.add(translator)
+            for i, text in enumerate(texts):
+                if futures[i] is not None:
+                    continue
+                priority = float(priorities[i]) if priorities is not None else 0.0
+                key = (translator.pair, text)
+                future = self.pending.get(key)
+                if future is None or future.cancelled():
+                    future = self.pending[key] = Future()
+                    self.priorities[key] = priority
+                    self.submitted[key] = time.perf_counter()
+                    self.deadlines[key] = deadline
+                    heapq.heappush(self.heap, (-priority, next(self.sequence), translator, text, future))
+                elif priority > self.priorities[key]:
+                    # entri lama tetap di heap, dilewati saat future-nya sudah jalan
+                    self.priorities[key] = priority
+                    heapq.heappush(self.heap, (-priority, next(self.sequence), translator, text, future))
+                if deadline is not None and (self.deadlines[key] is None or deadline < self.deadlines[key]):
+                    # teks yang sama di frame lain, pakai deadline yang paling awal
+                    self.deadlines[key] = deadline
+                futures[i] = future
+            self.condition.notify()
+        return futures
+
+    def shed_load(self):
+        """Cancel the lowest priority requests above `max_queued` that a batch already passed over
+
+        Called when a batch is taken, so a burst submitted to an idle
+        worker is kept; only a queue that stays longer than `max_queued`
+        while batches run loses its oldest low priority requests."""
+        with self.lock:
+            if self.max_queued is None or len(self.heap) <= self.max_queued:
+                return
+            self.heap.sort()
+            kept = self.heap[:self.max_queued]
+            for entry in self.heap[self.max_queued:]:
+                negative_priority, _, translator, text, future = entry
+                key = (translator.pair, text)
+                if future.done() or self.priorities.get(key) != -negative_priority:
+                    # entri duplikat dengan prioritas lama, future-nya masih ada di entri lain
+                    continue
+                if self.submitted[key] >= self.last_batch:
+                    kept.append(entry)
+                elif future.cancel():
+                    self.forget(key, future)
+                    self.shed += 1
+            self.heap = kept
+            heapq.heapify(self.heap)
+
+    def set_live(self, owner, pair, texts):
+        """Texts `owner` still shows, queued requests nobody shows anymore are cancelled"""
+        with self.lock:
+            self.live[owner] = {(pair, text) for text in texts}
+            self.cancel_stale()
+
+    def release(self, owner):
+        """Forget `owner`, e.g. when its window closes, and cancel what only it needed"""
+        with self.lock:
+            self.live.pop(owner, None)
+            self.cancel_stale()
+
+    def cancel_stale(self):
+        with self.lock:
+            live = set().union(*self.live.values())
+            for key, future in list(self.pending.items()):
+                # future yang sedang berjalan tidak bisa di-cancel
+                if key not in live and future.cancel():
+                    self.forget(key, future)
+                    self.cancelled += 1
+            self.heap = [entry for entry in self.heap if not entry[4].cancelled()]
+            heapq.heapify(self.heap)
+
+    def forget(self, key, future):
+        with self.lock:
+            if self.pending.get(key) is future:
+                del self.pending[key]
+                del self.priorities[key]
+                del self.submitted[key]
+                del self.deadlines[key]
+
+    def is_live(self, pair, text) -> bool:
+        with self.lock:
+            return not self.live or any((pair, text) in keys for keys in self.live.values())
+
+    def next_batch(self, timeout=None) -> list:
+        """Up to `max_batch_size` queued requests, highest priority first, empty after `timeout` seconds idle"""
+        with self.condition:
+            while self.running and not self.heap:
+                if not self.condition.wait(timeout):
+                    return []
+            # tunggu sebentar supaya request dari frame/window lain ikut satu batch
+            deadline = time.monotonic() + self.max_wait_ms / 1000
+            while self.running and len(self.heap) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.condition.wait(remaining)
+            batch = []
+            seen = set()
+            while self.heap and len(batch) < self.max_batch_size:
+                _, _, translator, text, future = heapq.heappop(self.heap)
+                if future.done() or future.running() or id(future) in seen:
+                    continue
+                seen.add(id(future))
+                batch.append((translator, text, future))
+            self.shed_load()
+            self.last_batch = time.perf_counter()
+            return batch
+
+    def run(self):
+        while self.running:
+            groups = {}
+            batch = self.next_batch(self.refine_after)
+            if not batch:
+                self.refine()
+                continue
+            self.batch_sizes.append(len(batch))
+            for translator, text, future in batch:
+                groups.setdefault(translator, []).append((text, future))
+            self.active = True
+            for translator, items in groups.items():
+                self.translate(translator, items)
+            self.last_busy = time.monotonic()
+            self.active = False
+
+    def refine(self):
+        """Translate provisional translations again at the best level while nothing is queued"""
+        if self.refine_after is None or self.idle_for() < self.refine_after:
+            return
+        for translator in list(self.translators):
+            refine = getattr(translator, "refine", None)
+            if refine is None:
+                continue
+            self.active = True
+            try:
+                count = refine(self.refine_batch_size)
+            except Exception as e:
+                print(f"refining translations failed: {e}")
+                count = 0
+            finally:
+                self.active = False
+            if count:
+                self.refined += count
+                self.last_busy = time.monotonic()
+                # satu batch saja, lalu cek lagi apakah ada frame baru
+                return
+
+    def translate(self, translator, items):
+        running = [(text, future) for text, future in items if future.set_running_or_notify_cancel()]
+        try:
+            if running:
+                with self.lock:
+                    deadlines = [self.deadlines[(translator.pair, text)] for text, _ in running]
+                deadlines = [deadline for deadline in deadlines if deadline is not None]
+                translations = translator.translate_batch([text for text, _ in running],
+                                                          deadline=min(deadlines) if deadlines else None)
+                done = time.perf_counter()
+                with self.lock:
+                    for text, _ in running:
+                        self.latencies.append((done - self.submitted[(translator.pair, text)]) * 1000)
+                for (_, future), translation in zip(running, translations):
+                    future.set_result(translation)
+                self.completed += len(running)
+                self.stale += sum(not self.is_live(translator.pair, text) for text, _ in running)
+        except Exception as e:
+            print(f"translation failed: {e}")
+            for _, future in running:
+                future.set_exception(e)
+            self.failed += len(running)
+        finally:
+            for text, future in items:
+                self.forget((translator.pair, text), future)
+
+    @property
+    def queued(self) -> int:
+        return len(self.heap)
+
+    def idle_for(self) -> float:
+        """Seconds since the worker last had something to translate, 0 while busy"""
+        if self.active or self.heap:
+            return 0.0
+        return time.monotonic() - self.last_busy
+
+    def stats(self) -> dict:
+        latencies = np.array(self.latencies) if self.latencies else np.zeros(1)
+        return {"queued": self.queued, "pending": len(self.pending), "completed": self.completed,
+                "failed": self.failed, "cancelled": self.cancelled, "stale": self.stale, "shed": self.shed,
+                "refined": self.refined,
+                "mean_batch_size": float(np.mean(self.batch_sizes)) if self.batch_sizes else 0.0,
+                "latency_p50_ms": float(np.percentile(latencies, 50)),
+                "latency_p95_ms": float(np.percentile(latencies, 95))}
+
+    def close(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()